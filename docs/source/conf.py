@@ -12,6 +12,7 @@
 
 import sys
 import os
+import importlib.util
 from datetime import date
 import warnings
 
@@ -19,11 +20,19 @@ import sigmaepsilon as library
 
 from sphinx.config import Config
 
+
 # If extensions (or modules to document with autodoc) are in another directory,
 # add these directories to sys.path here. If the directory is relative to the
 # documentation root, use os.path.abspath to make it absolute, like shown here.
-sys.path.insert(0, os.path.abspath("."))
-sys.path.insert(0, os.path.abspath("../../src"))
+def _prepend(path: str):
+    # avoid piling up entries when the config is reloaded (sphinx-autobuild)
+    path = os.path.abspath(path)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+for _path in (".", "../../src"):
+    _prepend(_path)
 
 from doc_utils import generate_examples_gallery_rst
 
@@ -83,8 +92,19 @@ extensions = [
     "sphinx_inline_tabs",
 ]
 
+# fast incremental HTML builds with 'make fasthtml', if available
+try:
+    if importlib.util.find_spec("sphinxnotes.fasthtml") is not None:
+        extensions.append("sphinxnotes.fasthtml")
+except ModuleNotFoundError:  # the 'sphinxnotes' namespace is missing
+    pass
+
 autosummary_generate = True
 
+# Keep API objects out of the table of contents, generating these entries
+# is a significant overhead since Sphinx 5.2.
+toc_object_entries = False
+
 templates_path = ["_templates"]
 
 exclude_patterns = ["_build"]
@@ -159,6 +179,14 @@ html_theme = "pydata_sphinx_theme"
 
 html_static_path = ["_static"]
 
+# -- nbsphinx configuration -------------------------------------------------
+
+# Use NBSPHINX_EXECUTE to control notebook execution. Setting it to 'never'
+# (or setting SPHINX_FAST) reuses the outputs stored in the notebooks.
+nbsphinx_execute = os.environ.get("NBSPHINX_EXECUTE", "auto")
+if os.environ.get("SPHINX_FAST"):
+    nbsphinx_execute = "never"
+
 # This is processed by Jinja2 and inserted before each notebook
 nbsphinx_prolog = r"""
 {% set docname = 'docs/source/' + env.doc2path(env.docname, base=None) %}
@@ -12,18 +12,29 @@ def generate_examples_gallery_rst(
     folder_path = os.path.dirname(file_path)
     gallery_rst_path = os.path.join(folder_path, filename + ".rst")
     gallery_folder_path = os.path.join(folder_path, foldername)
-    notebook_list = glob.glob(os.path.join(gallery_folder_path, "*.ipynb"))
+    notebook_list = sorted(glob.glob(os.path.join(gallery_folder_path, "*.ipynb")))
     notebook_names = [os.path.basename(file_path) for file_path in notebook_list]
 
-    with open(gallery_rst_path, "w") as f:
-        f.write(title + "\n")
-        f.write(len(title) * "-" + "\n")
-        f.write("\n")
-        f.write(r".. nbgallery::" + "\n")
-        f.write(r"    :maxdepth: 1" + "\n")
-        if reversed:
-            f.write(r"    :reversed:" + "\n")
-        f.write("\n")
+    lines = [
+        title + "\n",
+        len(title) * "-" + "\n",
+        "\n",
+        r".. nbgallery::" + "\n",
+        r"    :maxdepth: 1" + "\n",
+    ]
+    if reversed:
+        lines.append(r"    :reversed:" + "\n")
+    lines.append("\n")
+    for nb in notebook_names:
+        lines.append(r"    {foldername}/".format(foldername=foldername) + nb + "\n")
+    content = "".join(lines)
+
+    # Only touch the file if the content changed, otherwise Sphinx sees a
+    # new mtime and re-reads the gallery (and its toctree) on every build.
+    if os.path.exists(gallery_rst_path):
+        with open(gallery_rst_path, "r") as f:
+            if f.read() == content:
+                return
 
-        for nb in notebook_names:
-            f.write(r"    {foldername}/".format(foldername=foldername) + nb + "\n")
+    with open(gallery_rst_path, "w") as f:
+        f.write(content)
@@ -1,31 +1,32 @@
 # -*- coding: utf-8 -*-
 import codecs
 import os.path
+import re
+from functools import lru_cache
 from setuptools import find_packages, setup
 
 
+@lru_cache(maxsize=None)
 def read(rel_path):
     here = os.path.abspath(os.path.dirname(__file__))
     with codecs.open(os.path.join(here, rel_path), "r") as fp:
         return fp.read()
 
 
+def get_dunder(rel_path, name):
+    pattern = r"^__{}__\s*=\s*['\"]([^'\"]*)['\"]".format(name)
+    match = re.search(pattern, read(rel_path), re.M)
+    if match is None:
+        raise RuntimeError("Unable to find {} string.".format(name))
+    return match.group(1)
+
+
 def get_version(rel_path):
-    for line in read(rel_path).splitlines():
-        if line.startswith("__version__"):
-            delim = '"' if '"' in line else "'"
-            return line.split(delim)[1]
-    else:
-        raise RuntimeError("Unable to find version string.")
+    return get_dunder(rel_path, "version")
 
 
 def get_description(rel_path):
-    for line in read(rel_path).splitlines():
-        if line.startswith("__description__"):
-            delim = '"' if '"' in line else "'"
-            return line.split(delim)[1]
-    else:
-        raise RuntimeError("Unable to find description string.")
+    return get_dunder(rel_path, "description")
 
 
 with open("README.md", "r") as fh:
@@ -5,6 +5,7 @@ from functools import partial
 from scipy.sparse import coo_matrix
 import numpy as np
 from numpy import ndarray
+from numpy.typing import DTypeLike
 
 from neumann.linalg import ReferenceFrame
 from neumann import atleast1d, atleastnd, ascont
@@ -308,15 +309,33 @@ class FiniteElement(CellData, FemMixin):
             dshp = self.shape_function_derivatives(points)[cells]
 
         ecoords = self.local_coordinates()[cells]
-        jac = self.jacobian_matrix(dshp=dshp, ecoords=ecoords)
-        # (nE, nP, nD, nD)
-        B = self.strain_displacement_matrix(shp=shp, dshp=dshp, jac=jac)
-        # (nE, nP, nSTRE, nEVAB)
-        dofsol = ascont(np.swapaxes(dofsol, 1, 2))  # (nE, nRHS, nEVAB)
-        strains = approx_element_solution_bulk(dofsol, B)  # (nE, nRHS, nP, nSTRE)
+        strains = self._strains_bulk_(
+            dofsol=dofsol, shp=shp, dshp=dshp, ecoords=ecoords
+        )  # (nE, nRHS, nP, nSTRE)
         strains = ascont(np.moveaxis(strains, 1, -1))  # (nE, nP, nSTRE, nRHS)
         return strains
 
+    def _strains_bulk_(
+        self,
+        *,
+        dofsol: ndarray,  # (nE, nNE * nDOF, nRHS)
+        shp: ndarray,
+        dshp: ndarray,
+        ecoords: ndarray,
+        jac: ndarray = None,
+        B: ndarray = None,
+    ) -> ndarray:
+        # The calculation only depends on the data provided, hence it can be
+        # carried out for the stacked data of several blocks of the same type.
+        if B is None:
+            if jac is None:
+                jac = self.jacobian_matrix(dshp=dshp, ecoords=ecoords)
+            # (nE, nP, nD, nD)
+            B = self.strain_displacement_matrix(shp=shp, dshp=dshp, jac=jac)
+        # (nE, nP, nSTRE, nEVAB)
+        dofsol = ascont(np.swapaxes(dofsol, 1, 2))  # (nE, nRHS, nEVAB)
+        return approx_element_solution_bulk(dofsol, B)  # (nE, nRHS, nP, nSTRE)
+
     def kinetic_strains(
         self,
         *_,
@@ -348,22 +367,18 @@ class FiniteElement(CellData, FemMixin):
             load cases.
         """
         key = self._dbkey_strain_loads_
-        try:
+        if key in self.db.fields:
             sloads = self.db[key].to_numpy()
-        except Exception as e:
-            if key not in self.db.fields:
-                nE = len(self)
-                nodal_loads = self.pointdata.loads
-                if len(nodal_loads.shape) == 2:
-                    nRHS = 1
-                else:
-                    nRHS = self.pointdata.loads.shape[-1]
-                nSTRE = self.__class__.NSTRE
-                sloads = np.zeros((nE, nSTRE, nRHS))
+        else:
+            nE = len(self)
+            nodal_loads = self.pointdata.loads
+            if len(nodal_loads.shape) == 2:
+                nRHS = 1
             else:
-                raise e
-        finally:
-            sloads = atleastnd(sloads, 3, back=True)  # (nE, nSTRE=4, nRHS)
+                nRHS = self.pointdata.loads.shape[-1]
+            nSTRE = self.__class__.NSTRE
+            sloads = np.zeros((nE, nSTRE, nRHS))
+        sloads = atleastnd(sloads, 3, back=True)  # (nE, nSTRE=4, nRHS)
 
         if isinstance(cells, Iterable):
             cells = atleast1d(cells)
@@ -470,20 +485,34 @@ class FiniteElement(CellData, FemMixin):
     ) -> ndarray:
         dofsol = self.dof_solution(flatten=True, cells=cells)
         # dofsol -> (nE, nNE * nDOF, nRHS)
+        return self._internal_forces_bulk_(
+            dofsol=dofsol,
+            shp=self.shape_function_values(points)[cells],
+            dshp=self.shape_function_derivatives(points)[cells],
+            ecoords=self.local_coordinates()[cells],
+            kinetic_strains=self.kinetic_strains(points=points)[cells],
+            D=self.elastic_material_stiffness_matrix()[cells],
+        )
 
-        shp = self.shape_function_values(points)[cells]
-        dshp = self.shape_function_derivatives(points)[cells]
-        ecoords = self.local_coordinates()[cells]
-        jac = self.jacobian_matrix(dshp=dshp, ecoords=ecoords)
-        # jac -> (nE, nP, 1, 1)
-        B = self.strain_displacement_matrix(shp=shp, dshp=dshp, jac=jac)
-        # B -> (nE, nP, nSTRE, nNODE * nDOFN)
-
-        dofsol = ascont(np.swapaxes(dofsol, 1, 2))  # (nE, nRHS, nEVAB)
-        strains = approx_element_solution_bulk(dofsol, B)
+    def _internal_forces_bulk_(
+        self,
+        *,
+        dofsol: ndarray,  # (nE, nNE * nDOF, nRHS)
+        shp: ndarray,
+        dshp: ndarray,
+        ecoords: ndarray,
+        kinetic_strains: ndarray,
+        D: ndarray,
+        jac: ndarray = None,
+        B: ndarray = None,
+    ) -> ndarray:
+        # The calculation only depends on the data provided, hence it can be
+        # carried out for the stacked data of several blocks of the same type.
+        strains = self._strains_bulk_(
+            dofsol=dofsol, shp=shp, dshp=dshp, ecoords=ecoords, jac=jac, B=B
+        )
         # strains -> (nE, nRHS, nP, nSTRE)
-        strains -= self.kinetic_strains(points=points)[cells]
-        D = self.elastic_material_stiffness_matrix()[cells]
+        strains -= kinetic_strains
 
         forces = np.zeros_like(strains)
         inds = np.arange(forces.shape[-1])
@@ -637,6 +666,7 @@ class FiniteElement(CellData, FemMixin):
         transform: bool = True,
         minval: float = 1e-12,
         sparse: bool = False,
+        dtype: DTypeLike = None,
         **kwargs,
     ) -> Union[ndarray, coo_matrix]:
         """
@@ -652,6 +682,15 @@ class FiniteElement(CellData, FemMixin):
             value to diable its effect. Default is 1e-12.
         sparse: bool, Optional
             If True, the returned object is a sparse COO matrix. Default is False.
+        dtype: DTypeLike, Optional
+            The floating point type of the integration, eg. `numpy.float32`.
+            The shape functions, the jacobians and the material stiffness
+            matrices are calculated in double precision and converted to this
+            type, only the integration kernels run in the requested precision.
+            The result is converted back, it is always returned and stored in
+            double precision, hence this does not reduce memory usage. Only has
+            an effect if the stiffness matrix is not yet calculated. Default is
+            None, which means double precision.
 
         Returns
         -------
@@ -661,7 +700,7 @@ class FiniteElement(CellData, FemMixin):
         """
         dbkey = self._dbkey_stiffness_matrix_
         if dbkey not in self.db.fields:
-            K = self._elastic_stiffness_matrix_(transform=False, **kwargs)
+            K = self._elastic_stiffness_matrix_(transform=False, _dtype=dtype, **kwargs)
             assert_min_diagonals_bulk(K, minval)
             self.db[dbkey] = K
         else:
@@ -732,19 +771,43 @@ class FiniteElement(CellData, FemMixin):
         shp = self.shape_function_values(q.pos)
         dshp = self.shape_function_derivatives(q.pos)
         jac = self.jacobian_matrix(dshp=dshp, ecoords=ec)
+        D = kwargs.get("_D", self.elastic_material_stiffness_matrix())
+        weights = q.weight
+        dtype = kwargs.get("_dtype", None)
+        if dtype is not None:
+            # the inputs are converted and the integration kernels run in the
+            # requested precision, the results are cast back to double precision
+            shp, dshp, jac, D, weights = (
+                np.asarray(x, dtype=dtype) for x in (shp, dshp, jac, D, weights)
+            )
+        if self.integrate_stiffness_matrix is not None:
+            # the material model integrates the stiffness matrix directly
+            K, B = self.integrate_stiffness_matrix(
+                shp=shp,
+                dshp=dshp,
+                jac=jac,
+                weights=weights,
+                D=D,
+                inds=q.inds,
+            )
+            dbkey = self._dbkey_strain_displacement_matrix_
+            self.db[dbkey] = self.db[dbkey].to_numpy() + B
+            return K.astype(float, copy=False)
         B = self.strain_displacement_matrix(shp=shp, dshp=dshp, jac=jac)
         if q.inds is not None:
             # zero out unused indices, only for selective integration
             inds = np.where(~np.in1d(np.arange(self.NSTRE), q.inds))[0]
             B[:, :, inds, :] = 0.0
         djac = self.jacobian(jac=jac)
+        if dtype is not None:
+            B, djac = np.asarray(B, dtype=dtype), np.asarray(djac, dtype=dtype)
         # B (nE, nG, nSTRE=4, nNODE * nDOF=6)
         dbkey = self._dbkey_strain_displacement_matrix_
         _B = self.db[dbkey].to_numpy()
-        _B += strain_displacement_matrix_bulk2(B, djac, q.weight)
+        _B += strain_displacement_matrix_bulk2(B, djac, weights)
         self.db[dbkey] = _B
-        D = kwargs.get("_D", self.elastic_material_stiffness_matrix())
-        return stiffness_matrix_bulk2(D, B, djac, q.weight)
+        K = stiffness_matrix_bulk2(D, B, djac, weights)
+        return K.astype(float, copy=False)
 
     def consistent_mass_matrix(
         self,
@@ -873,7 +936,11 @@ class FiniteElement(CellData, FemMixin):
         return mass_matrix_bulk(N, _dens, _areas, djac, q.weight)
 
     def load_vector(
-        self, transform: bool = True, assemble: bool = False, **__
+        self,
+        transform: bool = True,
+        assemble: bool = False,
+        strain_loads: ndarray = None,
+        **kwargs,
     ) -> ndarray:
         """
         Builds the equivalent nodal load vector from all sources
@@ -887,6 +954,10 @@ class FiniteElement(CellData, FemMixin):
         transform: bool, Optional
             If True, local matrices are transformed to the global frame.
             Default is True.
+        strain_loads: numpy.ndarray, Optional
+            Strain loads to use instead of the ones stored in the database.
+            If provided, the load vector is recalculated and it is not stored
+            in the database. Default is None.
 
         See Also
         --------
@@ -901,11 +972,15 @@ class FiniteElement(CellData, FemMixin):
             unknowns of the structure and the number of load cases.
         """
         dbkey = self._dbkey_nodal_load_vector_
-        if dbkey not in self.db.fields:
+        if kwargs.get("_f", None) is not None:
+            # an already calculated (eg. condensed) load vector
+            f = kwargs["_f"]
+        elif strain_loads is not None or dbkey not in self.db.fields:
             options = dict(transform=False, assemble=False, return_zeroes=True)
             f = self.body_load_vector(**options)
-            f += self.strain_load_vector(**options)
-            self.db[dbkey] = f
+            f += self.strain_load_vector(strain_loads, **options)
+            if strain_loads is None:
+                self.db[dbkey] = f
         else:
             f = self.db[dbkey].to_numpy()
         if transform:
@@ -957,13 +1032,12 @@ class FiniteElement(CellData, FemMixin):
             The equivalent load vector.
         """
         dbkey = self._dbkey_strain_loads_
-        try:
-            if values is None:
+        if values is None:
+            if dbkey in self.db.fields:
                 values = self.db[dbkey].to_numpy()
-        except Exception as e:
-            if dbkey not in self.db.fields:
-                if not return_zeroes:
-                    return None
+            elif not return_zeroes:
+                return None
+            else:
                 if len(self.pointdata.loads.shape) == 2:
                     nRHS = 1
                 else:
@@ -971,10 +1045,7 @@ class FiniteElement(CellData, FemMixin):
                 nE = len(self)
                 nSTRE = self.__class__.NSTRE
                 values = np.zeros((nE, nSTRE, nRHS))
-            else:
-                raise e
-        finally:
-            values = atleastnd(values, 3, back=True)  # (nE, nSTRE, nRHS)
+        values = atleastnd(values, 3, back=True)  # (nE, nSTRE, nRHS)
 
         nodal_loads = self._strain_load_vector_(values)
         # (nE, nTOTV, nRHS)
@@ -1058,13 +1129,12 @@ class FiniteElement(CellData, FemMixin):
         """
         nNE = self.__class__.NNODE
         dbkey = self._dbkey_body_loads_
-        try:
-            if values is None:
+        if values is None:
+            if dbkey in self.db.fields:
                 values = self.db[dbkey].to_numpy()
-        except Exception as e:
-            if dbkey not in self.db.fields:
-                if not return_zeroes:
-                    return None
+            elif not return_zeroes:
+                return None
+            else:
                 if len(self.pointdata.loads.shape) == 2:
                     nRHS = 1
                 else:
@@ -1072,10 +1142,7 @@ class FiniteElement(CellData, FemMixin):
                 nE = len(self)
                 nDOF = self.__class__.NDOFN
                 values = np.zeros((nE, nNE, nDOF, nRHS))
-            else:
-                raise e
-        finally:
-            values = atleastnd(values, 4, back=True)  # (nE, nNE, nDOF, nRHS)
+        values = atleastnd(values, 4, back=True)  # (nE, nNE, nDOF, nRHS)
 
         # prepare data to shape (nE, nNE * nDOF, nRHS)
         if constant:
@@ -1162,10 +1229,24 @@ class FiniteElement(CellData, FemMixin):
         # (nE, nEVAB, nRHS)
         return f
 
-    def condensate(self):
+    def condensate(self, strain_loads: ndarray = None) -> Union[ndarray, None]:
         """
         Applies static condensation to account for cell fixity.
 
+        Parameters
+        ----------
+        strain_loads: numpy.ndarray, Optional
+            Strain loads to use instead of the ones stored in the database.
+            If provided, the load vector is calculated with them and condensed
+            along with the stiffness matrix, but it is returned instead of being
+            stored in the database. Default is None.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            The condensed load vector in the local frames of the cells if strain
+            loads are provided and the cells have fixity information, otherwise None.
+
         References
         ----------
         .. [1] Duan Jin, Li-Yun-gui "About the Finite Element
@@ -1186,6 +1267,12 @@ class FiniteElement(CellData, FemMixin):
         nEVAB_full = nNE * nDOF - 0.001
         cond = np.sum(fixity, axis=1) < nEVAB_full
         i = np.where(cond)[0]
+        f_override = None
+        if strain_loads is not None:
+            f_override = self.load_vector(
+                transform=False, assemble=False, strain_loads=strain_loads
+            )
+            _, f_override[i] = condensate_Kf_bulk(K[i], f_override[i], fixity[i])
         K[i], f[i] = condensate_Kf_bulk(K[i], f[i], fixity[i])
         assert_min_diagonals_bulk(K, 1e-12)
         self.db[dbkey_K] = K
@@ -1195,6 +1282,7 @@ class FiniteElement(CellData, FemMixin):
             M[i] = condensate_M_bulk(M[i], fixity[i])
             assert_min_diagonals_bulk(M, 1e-12)
             self.db[dbkey_M] = M
+        return f_override
 
     def _transform_coeff_matrix_(
         self, A: ndarray, *args, invert: bool = False, **kwargs
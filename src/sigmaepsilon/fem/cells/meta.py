@@ -21,6 +21,9 @@ class FemMixin:
     # optional
     qrule: str = None
     quadrature = None
+    # a classmethod of the material model that returns the stiffness matrices
+    # and the integrated strain-displacement matrices in one go
+    integrate_stiffness_matrix = None
 
     # advanced settings
     compatible = True
@@ -1,36 +1,94 @@
-from typing import Iterable, Union
+from typing import Iterable, Union, List
 
 import numpy as np
 from numpy import ndarray
+from numpy.typing import DTypeLike
+from numba import get_num_threads
 
 from neumann.linalg import ReferenceFrame
+from polymesh.utils.space import index_of_closest_point
 
 from ..structure import Structure
+from ..mesh import FemMesh
 from ..ebc import NodeToNode
 from .ebc import _link_opposite_sides_sym, _link_opposite_sides
 from .utils import (
     _strain_field_3d_bulk,
-    _postproc_3d_gauss_stresses,
-    _calc_avg_hooke_3d_to_shell,
+    _homogenize_block_3d_kernel,
+    _shape_function_data,
     _tr_strains_to_local_frames,
 )
 
 __all__ = ["RepresentativeVolumeElement"]
 
 
+def _stack(arrays: List[ndarray]) -> ndarray:
+    return arrays[0] if len(arrays) == 1 else np.concatenate(arrays, axis=0)
+
+
 class RepresentativeVolumeElement(Structure):
     def __init__(self, *args, symmetric: bool = False, **kwargs):
+        self._buf_cache = {}
+        self._periodicity_cache = {}
+        self._frame_cache = {}
         super().__init__(*args, **kwargs)
         self.symmetric = symmetric
 
+    @Structure.mesh.setter
+    def mesh(self, value: FemMesh):
+        """
+        Sets the underlying mesh object.
+        """
+        Structure.mesh.fset(self, value)
+        self.invalidate_geometry_cache()
+
+    def invalidate_geometry_cache(self) -> None:
+        """
+        Clears the data cached between subsequent homogenizations. Call this
+        if the geometry of the mesh is modified in place.
+        """
+        self._buf_cache.clear()
+        self._periodicity_cache.clear()
+        self._frame_cache.clear()
+
+    def _local_frames(self, block) -> ReferenceFrame:
+        """
+        Returns the frames of the cells of a block. The result is cached.
+        """
+        frame = self._frame_cache.get(id(block), None)
+        if frame is None:
+            frame = ReferenceFrame(block.cd.frames)
+            self._frame_cache[id(block)] = frame
+        return frame
+
+    def _get_buffer(self, key: tuple, shape: tuple, dtype=float) -> ndarray:
+        """
+        Returns a zeroed out array of the given shape. The memory is reused
+        between subsequent calls with the same key.
+        """
+        key = key + tuple(shape)
+        buf = self._buf_cache.get(key, None)
+        if buf is None:
+            buf = np.zeros(shape, dtype=dtype)
+            self._buf_cache[key] = buf
+        else:
+            buf.fill(0)
+        return buf
+
     def _periodic_essential_ebc(
         self,
         axis: Union[int, Iterable[int]] = 0,
     ) -> NodeToNode:
-        if self.symmetric:
-            return _link_opposite_sides_sym(self.mesh.points(), axis)
-        else:
-            return _link_opposite_sides(self.mesh, axis)
+        axis = (axis,) if isinstance(axis, int) else tuple(axis)
+        key = (id(self.mesh), axis, self.symmetric)
+        ebc = self._periodicity_cache.get(key, None)
+        if ebc is None:
+            if self.symmetric:
+                ebc = _link_opposite_sides_sym(self.mesh.points(), list(axis))
+            else:
+                ebc = _link_opposite_sides(self.mesh, list(axis))
+            self._periodicity_cache[key] = ebc
+        return ebc
 
     def ABD(self) -> ndarray:
         """
@@ -54,7 +112,9 @@ class RepresentativeVolumeElement(Structure):
         """
         return self.homogenize(target="MR")
 
-    def homogenize(self, target: str = "MR") -> ndarray:
+    def homogenize(
+        self, target: str = "MR", *, dtype: DTypeLike = np.float64
+    ) -> ndarray:
         """
         Returns the homogenized elasticity matrix for a Mindlin-Reissner or a
         Kirchhoff-Love plate.
@@ -64,6 +124,14 @@ class RepresentativeVolumeElement(Structure):
         target: str, Optional
             The target model. Accepted values are 'MR' for Mindlin-Reissner
             shells and 'KL' for Kirchhoff-Love shells.
+        dtype: DTypeLike, Optional
+            The floating point type in which the stresses, the coordinates and
+            the material stiffness matrices enter the integration over the
+            volume. These are calculated in double precision and copied,
+            hence a lower precision does not save memory, it only reduces the
+            accuracy of the inputs. The sums are always accumulated in double
+            precision and the linear solution is not affected. Default is
+            `numpy.float64`.
 
         Returns
         -------
@@ -72,9 +140,11 @@ class RepresentativeVolumeElement(Structure):
         """
         target = target.lower()
         if target in ["mr", "kl"]:
-            return self._to_shell(target)
+            return self._to_shell(target, dtype=dtype)
 
-    def _to_shell(self, target: str = "MR") -> ndarray:
+    def _to_shell(
+        self, target: str = "MR", *, dtype: DTypeLike = np.float64
+    ) -> ndarray:
         mesh = self.mesh
         NDOFN = mesh.NDOFN
 
@@ -90,64 +160,92 @@ class RepresentativeVolumeElement(Structure):
         [(xmin, xmax), (ymin, ymax), (_, zmax)] = points.bounds()
         area = (xmax - xmin) * (ymax - ymin)
 
+        nP = len(points)
+
         # nodal loads
-        nodal_loads = np.zeros((len(points), NDOFN, NSTRE), dtype=float)
+        nodal_loads = self._get_buffer(("nl",), (nP, NDOFN, NSTRE))
         mesh.pd.loads = nodal_loads
 
         # nodal supports against rigid body motion
-        nodal_fixity = np.zeros((len(points), NDOFN), dtype=bool)
-        i = points.index_of_closest([xmin, ymax, zmax])
-        nodal_fixity[i, :3] = True
-        i = points.index_of_closest([xmax, ymax, zmax])
-        nodal_fixity[i, 2] = True
-        i = points.index_of_closest([xmin, ymin, zmax])
-        nodal_fixity[i, 2] = True
-        i = points.index_of_closest([xmax, ymin, zmax])
-        nodal_fixity[i, 1] = True
+        nodal_fixity = self._get_buffer(("fix",), (nP, NDOFN), dtype=bool)
+        corners = np.array(
+            [
+                [xmin, ymax, zmax],
+                [xmax, ymax, zmax],
+                [xmin, ymin, zmax],
+                [xmax, ymin, zmax],
+            ]
+        )
+        i = index_of_closest_point(points.show(), corners)
+        nodal_fixity[i[0], :3] = True
+        nodal_fixity[i[1], 2] = True
+        nodal_fixity[i[2], 2] = True
+        nodal_fixity[i[3], 1] = True
         mesh.pd.fixity = nodal_fixity
 
         # nodal supports to guarantee peridic displacement solution
         periodicity_constraints = self._periodic_essential_ebc(axis=[0, 1])
 
-        # initial strain loads
-        blocks = list(mesh.cellblocks(inclusive=True))
+        # initial strain loads, these are passed to the solver directly
+        # instead of being stored in the database of the cells
+        blocks = list(mesh.cellblocks_inclusive)
+        strain_loads_by_block = {}
         for block in blocks:
             centers = block.cd.centers()
-            strain_loads = np.zeros((centers.shape[0], NSTRE, 6))
+            strain_loads = self._get_buffer(
+                ("sl", id(block)), (centers.shape[0], NSTRE, 6)
+            )
             _strain_field_3d_bulk(centers, out=strain_loads, NSTRE=NSTRE)
             strain_loads[...] = _tr_strains_to_local_frames(
-                strain_loads, global_frame, block.cd.frames
+                strain_loads, global_frame, self._local_frames(block)
             )
             if block.cd.NDIM == 3:
-                block.cd.strain_loads = np.moveaxis(strain_loads, -1, -2)
+                strain_loads_by_block[id(block)] = np.moveaxis(strain_loads, -1, -2)
             else:
                 raise NotImplementedError
 
         # solve BVP
         self.constraints.append(periodicity_constraints)
-        self.linear_static_analysis()
+        self.linear_static_analysis(strain_loads=strain_loads_by_block)
 
         # postproc
-        hooke = np.zeros((NSTRE, NSTRE), dtype=float)
-        hooke_avg = np.zeros_like(hooke)
+        groups = {}
         for block in blocks:
-            block.cd.strain_loads = None
-            hooke_block = block.cd.elastic_material_stiffness_matrix(target="global")
-            gp, gw = block.cd.quadrature["full"]
             if block.cd.NDIM == 3:
-                cell_forces = block.cd.internal_forces(
-                    points=gp, flatten=False, target="global"
-                )
-                ec = block.cd.coords()
-                dshp = block.cd.shape_function_derivatives(gp)
-                jac = block.cd.jacobian_matrix(dshp=dshp, ecoords=ec)
-                djac = block.cd.jacobian(jac=jac)
-                ec = block.cd.coords(points=gp)
-                _postproc_3d_gauss_stresses(cell_forces, ec, gw, djac, hooke)
-                _calc_avg_hooke_3d_to_shell(hooke_block, ec, gw, djac, hooke_avg)
+                groups.setdefault(block.cd.__class__, []).append(block)
             else:
                 raise NotImplementedError
 
+        # blocks with the same cell type share the shape functions and the
+        # quadrature, their data is stacked and processed in one go
+        hooke = np.zeros((NSTRE, NSTRE), dtype=float)
+        hooke_avg = np.zeros_like(hooke)
+        for group in groups.values():
+            cd = group[0].cd
+            gp, gw = cd.quadrature["full"]
+            shp, dshp = _shape_function_data(cd.__class__, gp)
+            cell_forces = _stack(
+                self.internal_forces_batched(group, points=gp, target="global")
+            )
+            hooke_block = _stack(
+                [b.cd.elastic_material_stiffness_matrix(target="global") for b in group]
+            )
+            ec = _stack([b.cd.coords() for b in group])
+            # the inputs are calculated in double precision, the casts only
+            # create copies if another dtype is requested
+            _homogenize_block_3d_kernel(
+                ec.astype(dtype, copy=False),
+                shp.astype(dtype, copy=False),
+                dshp.astype(dtype, copy=False),
+                gw.astype(dtype, copy=False),
+                cell_forces.astype(dtype, copy=False),
+                hooke_block.astype(dtype, copy=False),
+                hooke,
+                hooke_avg,
+                NSTRE,
+                get_num_threads(),
+            )
+
         self.constraints.pop(-1)
 
         hooke /= area
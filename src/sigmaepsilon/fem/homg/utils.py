@@ -1,8 +1,9 @@
-from typing import Union
+from typing import Union, Tuple
+from functools import lru_cache
 
 import numpy as np
 from numpy import ndarray
-from numba import njit, prange
+from numba import njit, prange, literally
 
 from neumann.linalg import ReferenceFrame
 from sigmaepsilon.material import SmallStrainTensor
@@ -13,17 +14,41 @@ __cache = True
 def _tr_strains_to_local_frames(
     strains: ndarray,
     global_frame: Union[ndarray, ReferenceFrame],
-    local_frames: ndarray,
+    local_frames: Union[ndarray, ReferenceFrame],
 ) -> ndarray:
     if isinstance(global_frame, ndarray):
         source = ReferenceFrame(global_frame)
     elif isinstance(global_frame, ReferenceFrame):
         source = global_frame
-    target = ReferenceFrame(local_frames)
+    if isinstance(local_frames, ReferenceFrame):
+        target = local_frames
+    else:
+        target = ReferenceFrame(local_frames)
     tensor = SmallStrainTensor(strains, frame=source, tensorial=False)
     return tensor.contracted_components(target=target, engineering=True)
 
 
+def _shape_function_data(cell_class, points: ndarray) -> Tuple[ndarray, ndarray]:
+    """
+    Returns the values and the derivatives of the shape functions of a cell
+    class at the given points. The results are cached and read-only.
+    """
+    points = np.asarray(points, dtype=float)
+    return _cached_shape_function_data(cell_class, points.shape, points.tobytes())
+
+
+@lru_cache(maxsize=32)
+def _cached_shape_function_data(
+    cell_class, shape: tuple, data: bytes
+) -> Tuple[ndarray, ndarray]:
+    points = np.frombuffer(data, dtype=float).reshape(shape)
+    shp = np.ascontiguousarray(cell_class.shape_function_values(points))
+    dshp = np.ascontiguousarray(cell_class.shape_function_derivatives(points))
+    shp.setflags(write=False)
+    dshp.setflags(write=False)
+    return shp, dshp
+
+
 def _strain_field_3d_bulk(
     centers: ndarray, *, out: ndarray = None, NSTRE: int = 8
 ) -> ndarray:
@@ -51,36 +76,6 @@ def _strain_field_3d_bulk(
     return out
 
 
-@njit(nogil=True, parallel=False, fastmath=True, cache=__cache)
-def _postproc_3d_gauss_stresses(
-    cell_stresses: ndarray,  # cell stresses
-    cell_gauss_coords: ndarray,  # cell gauss coordinates
-    weights: ndarray,  # gauss weights
-    djac: ndarray,  # jacobian determinants
-    out: ndarray,  # ABD or ABDS matrix of shape (6, 6) or (8, 8)
-) -> ndarray:
-    nE, nP = cell_gauss_coords.shape[:2]
-    NSTRE = out.shape[0]
-    mindlin = NSTRE == 8
-    for iE in range(nE):
-        for iP in range(nP):
-            w = weights[iP]
-            z = cell_gauss_coords[iE, iP, 2]
-            dj = djac[iE, iP]
-            for j in range(NSTRE):
-                sxx, syy, _, syz, sxz, sxy = cell_stresses[iE, iP, :, j]
-                out[0, j] += sxx * w * dj
-                out[1, j] += syy * w * dj
-                out[2, j] += sxy * w * dj
-                out[3, j] += sxx * z * w * dj
-                out[4, j] += syy * z * w * dj
-                out[5, j] += sxy * z * w * dj
-                if mindlin:
-                    out[6, j] += sxz * w * dj
-                    out[7, j] += syz * w * dj
-    return out
-
-
 @njit(nogil=True, parallel=False, fastmath=True, cache=__cache)
 def _calc_avg_hooke_shell(
     hooke: ndarray,  # cell material stiffness matrices
@@ -93,42 +88,93 @@ def _calc_avg_hooke_shell(
     return out
 
 
-@njit(nogil=True, parallel=False, fastmath=True, cache=__cache)
-def _calc_avg_hooke_3d_to_shell(
-    hooke: ndarray,  # cell material stiffness matrices
-    cell_gauss_coords: ndarray,  # cell gauss coordinates
+@njit(nogil=True, parallel=True, fastmath=True, cache=__cache)
+def _homogenize_block_3d_kernel(
+    ec: ndarray,  # nodal coordinates of the cells
+    shp: ndarray,  # shape function values at the gauss points
+    dshp: ndarray,  # shape function derivatives at the gauss points
     weights: ndarray,  # gauss weights
-    djac: ndarray,  # jacobian determinants
+    cell_stresses: ndarray,  # cell stresses
+    hooke: ndarray,  # cell material stiffness matrices
     out: ndarray,  # ABD or ABDS matrix of shape (6, 6) or (8, 8)
-) -> ndarray:
-    C_126 = np.zeros((3, 3), dtype=hooke.dtype)
-    C_45 = np.zeros((2, 2), dtype=hooke.dtype)
-    nE, nP = cell_gauss_coords.shape[:2]
-    NSTRE = out.shape[0]
+    out_avg: ndarray,  # ABD or ABDS matrix of shape (6, 6) or (8, 8)
+    NSTRE: int,  # 6 or 8
+    nchunks: int = 1,  # number of chunks, typically the number of threads
+):
+    """
+    Integrates the stress resultants and the averaged material stiffness
+    of a block of 3d cells through the thickness in one pass, evaluating the
+    jacobian determinants and the coordinates of the gauss points on the fly.
+    The cells are split into `nchunks` contiguous chunks, contributions are
+    collected separately for every chunk and reduced at the end to avoid race
+    conditions. The input arrays may be single
+    precision, the sums are always accumulated in double precision.
+    The kernel is compiled separately for every value of `NSTRE`, hence
+    the bounds of the inner loops are known at compile time.
+    """
+    literally(NSTRE)
+    nE = ec.shape[0]
+    nP, nNE = shp.shape
     mindlin = NSTRE == 8
-    for iE in range(nE):
-        C11 = hooke[iE, 0, 0]
-        C12 = hooke[iE, 0, 1]
-        C22 = hooke[iE, 1, 1]
-        C66 = hooke[iE, 5, 5]
-        C55 = hooke[iE, 4, 4]
-        C44 = hooke[iE, 3, 3]
-        C_126[0, 0] = C11
-        C_126[0, 1] = C12
-        C_126[1, 0] = C12
-        C_126[1, 1] = C22
-        C_126[2, 2] = C66
-        if mindlin:
-            C_45[0, 0] = C55
-            C_45[1, 1] = C44
-        for iP in range(nP):
-            w = weights[iP]
-            z = cell_gauss_coords[iE, iP, 2]
-            dj = djac[iE, iP]
-            out[:3, :3] += C_126 * w * dj
-            out[:3, 3:6] += C_126 * z * w * dj
-            out[3:6, :3] += C_126 * z * w * dj
-            out[3:6, 3:6] += C_126 * z**2 * w * dj
+    nC = max(min(nE, nchunks), 1)
+    res = np.zeros((nC, NSTRE, NSTRE), dtype=out.dtype)
+    res_avg = np.zeros((nC, NSTRE, NSTRE), dtype=out.dtype)
+    for iC in prange(nC):
+        i0 = iC * nE // nC
+        i1 = (iC + 1) * nE // nC
+        for iE in range(i0, i1):
+            m0, m1, m2 = 0.0, 0.0, 0.0
+            for iP in range(nP):
+                j00, j01, j02 = 0.0, 0.0, 0.0
+                j10, j11, j12 = 0.0, 0.0, 0.0
+                j20, j21, j22 = 0.0, 0.0, 0.0
+                z = 0.0
+                for k in range(nNE):
+                    xk, yk, zk = ec[iE, k, 0], ec[iE, k, 1], ec[iE, k, 2]
+                    d0, d1, d2 = dshp[iP, k, 0], dshp[iP, k, 1], dshp[iP, k, 2]
+                    j00 += xk * d0
+                    j01 += xk * d1
+                    j02 += xk * d2
+                    j10 += yk * d0
+                    j11 += yk * d1
+                    j12 += yk * d2
+                    j20 += zk * d0
+                    j21 += zk * d1
+                    j22 += zk * d2
+                    z += shp[iP, k] * zk
+                dj = (
+                    j00 * (j11 * j22 - j12 * j21)
+                    - j01 * (j10 * j22 - j12 * j20)
+                    + j02 * (j10 * j21 - j11 * j20)
+                )
+                wdj = weights[iP] * dj
+                m0 += wdj
+                m1 += z * wdj
+                m2 += z**2 * wdj
+                for j in range(NSTRE):
+                    sxx, syy, _, syz, sxz, sxy = cell_stresses[iE, iP, :, j]
+                    res[iC, 0, j] += sxx * wdj
+                    res[iC, 1, j] += syy * wdj
+                    res[iC, 2, j] += sxy * wdj
+                    res[iC, 3, j] += sxx * z * wdj
+                    res[iC, 4, j] += syy * z * wdj
+                    res[iC, 5, j] += sxy * z * wdj
+                    if mindlin:
+                        res[iC, 6, j] += sxz * wdj
+                        res[iC, 7, j] += syz * wdj
+            C11 = hooke[iE, 0, 0]
+            C12 = hooke[iE, 0, 1]
+            C22 = hooke[iE, 1, 1]
+            C66 = hooke[iE, 5, 5]
+            for i, j, m in ((0, 0, m0), (0, 3, m1), (3, 0, m1), (3, 3, m2)):
+                res_avg[iC, i, j] += C11 * m
+                res_avg[iC, i, j + 1] += C12 * m
+                res_avg[iC, i + 1, j] += C12 * m
+                res_avg[iC, i + 1, j + 1] += C22 * m
+                res_avg[iC, i + 2, j + 2] += C66 * m
             if mindlin:
-                out[6:, 6:] += C_45 * w * dj
-    return out
+                res_avg[iC, 6, 6] += hooke[iE, 4, 4] * m0
+                res_avg[iC, 7, 7] += hooke[iE, 3, 3] * m0
+    for iC in range(nC):
+        out += res[iC]
+        out_avg += res_avg[iC]
@@ -42,12 +42,12 @@ def material_strains(strns: ndarray, z: float):
     return res
 
 
-@njit(nogil=True, parallel=True, cache=__cache)
+@njit(nogil=True, cache=__cache)
 def HMH(estrs: np.ndarray):
     nE, nP = estrs.shape[:2]
     res = np.zeros((nE, nP), dtype=estrs.dtype)
-    for iE in prange(nE):
-        for jNE in prange(nP):
+    for iE in range(nE):
+        for jNE in range(nP):
             res[iE, jNE] = HMH_M(estrs[iE, jNE])
     return res
 
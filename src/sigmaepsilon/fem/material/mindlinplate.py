@@ -1,8 +1,9 @@
-from numba import njit, prange
+from numba import njit, prange, literally
 import numpy as np
 from numpy import ndarray
 
-from ...utils.material.hmh import HMH_S
+from ...utils.material.hmh import HMH_S_bulk
+from ...utils.fem.cells.cells import _inv2
 
 from .surface import Surface
 
@@ -17,46 +18,61 @@ _NSTRE_ = 5
 _NDOFN_ = 3
 _NHOOKE_ = 5
 
-
-@njit(nogil=True, parallel=True, cache=__cache)
-def strain_displacement_matrix(shp: ndarray, dshp: ndarray, jac: ndarray) -> ndarray:
+# the nonzero entries of the strain-displacement matrix of a node, as
+# (strain component, local dof, source, sign), where the source is
+# 0 for the x derivative, 1 for the y derivative and 2 for the value
+# of the shape function
+_B_PATTERN_ = np.array(
+    [
+        [0, 2, 0, 1],
+        [1, 1, 1, -1],
+        [2, 1, 0, -1],
+        [2, 2, 1, 1],
+        [3, 0, 0, 1],
+        [3, 2, 2, 1],
+        [4, 0, 1, 1],
+        [4, 1, 2, -1],
+    ],
+    dtype=np.int64,
+)
+
+
+@njit(nogil=True, parallel=True, fastmath=True, boundscheck=False, cache=__cache)
+def strain_displacement_matrix(
+    shp: ndarray, dshp: ndarray, jac: ndarray, nN: int
+) -> ndarray:
+    # compiled for every number of nodes, for fixed trip counts in the loops
+    literally(nN)
     nE = jac.shape[0]
-    nP, nN = dshp.shape[:2]
+    nP = dshp.shape[0]
     nTOTV = nN * _NDOFN_
+    nB = _B_PATTERN_.shape[0]
     B = np.zeros((nE, nP, _NSTRE_, nTOTV), dtype=dshp.dtype)
     for iE in prange(nE):
-        for iP in prange(nP):
-            gdshp = dshp[iP] @ np.linalg.inv(jac[iE, iP])
-            for i in prange(nN):
-                B[iE, iP, 0, 2 + i * _NDOFN_] = gdshp[i, 0]
-                B[iE, iP, 1, 1 + i * _NDOFN_] = -gdshp[i, 1]
-                B[iE, iP, 2, 1 + i * _NDOFN_] = -gdshp[i, 0]
-                B[iE, iP, 2, 2 + i * _NDOFN_] = gdshp[i, 1]
-                B[iE, iP, 3, 0 + i * _NDOFN_] = gdshp[i, 0]
-                B[iE, iP, 3, 2 + i * _NDOFN_] = shp[iP, i]
-                B[iE, iP, 4, 0 + i * _NDOFN_] = gdshp[i, 1]
-                B[iE, iP, 4, 1 + i * _NDOFN_] = -shp[iP, i]
+        g = np.zeros(3, dtype=dshp.dtype)
+        for iP in range(nP):
+            i00, i01, i10, i11, _ = _inv2(jac[iE, iP])
+            for i in range(nN):
+                g[0] = dshp[iP, i, 0] * i00 + dshp[iP, i, 1] * i10
+                g[1] = dshp[iP, i, 0] * i01 + dshp[iP, i, 1] * i11
+                g[2] = shp[iP, i]
+                for k in range(nB):
+                    r, d, src, sgn = _B_PATTERN_[k]
+                    B[iE, iP, r, d + i * _NDOFN_] = sgn * g[src]
     return B
 
 
-@njit(nogil=True, parallel=True, cache=__cache)
-def material_strains(model_strains: ndarray, z: float, t: float) -> ndarray:
+def material_strains(model_strains: ndarray, z: float, t: ndarray) -> ndarray:
     nE, nP = model_strains.shape[:2]
     res = np.zeros((nE, nP, _NHOOKE_), dtype=model_strains.dtype)
     res[:, :, :3] = model_strains[:, :, :3] * z
-    for i in prange(nE):
-        res[i, :, 3:] = (5 / 4) * (1 - 4 * (z / t[i]) ** 2) * model_strains[i, :, 3:]
+    factor = (5 / 4) * (1 - 4 * (z / t) ** 2)
+    res[:, :, 3:] = factor[:, None, None] * model_strains[:, :, 3:]
     return res
 
 
-@njit(nogil=True, parallel=True, cache=__cache)
 def HMH(estrs: np.ndarray) -> ndarray:
-    nE, nP = estrs.shape[:2]
-    res = np.zeros((nE, nP), dtype=estrs.dtype)
-    for iE in prange(nE):
-        for jNE in prange(nP):
-            res[iE, jNE] = HMH_S(estrs[iE, jNE])
-    return res
+    return HMH_S_bulk(estrs)
 
 
 @njit(nogil=True, parallel=True, cache=__cache)
@@ -83,7 +99,7 @@ class MindlinPlate(Surface):
     def strain_displacement_matrix(
         cls, *_, shp=None, dshp=None, jac=None, **__
     ) -> ndarray:
-        return strain_displacement_matrix(shp, dshp, jac)
+        return strain_displacement_matrix(shp, dshp, jac, dshp.shape[1])
 
     @classmethod
     def HMH(cls, data, *_, **__) -> ndarray:
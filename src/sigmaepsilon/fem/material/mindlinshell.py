@@ -1,8 +1,11 @@
-from numba import njit, prange
+from typing import Tuple
+
+from numba import njit, prange, literally
 import numpy as np
 from numpy import ndarray
 
-from ...utils.material.hmh import HMH_S
+from ...utils.material.hmh import HMH_S_bulk
+from ...utils.fem.cells.cells import _inv2
 
 from .surface import Surface
 
@@ -17,51 +20,131 @@ _NSTRE_ = 8
 _NDOFN_ = 6
 _NHOOKE_ = 5
 
-
-@njit(nogil=True, parallel=True, cache=__cache)
-def strain_displacement_matrix(shp: ndarray, dshp: ndarray, jac: ndarray) -> ndarray:
+# the nonzero entries of the strain-displacement matrix of a node, as
+# (strain component, local dof, source, sign), where the source is
+# 0 for the x derivative, 1 for the y derivative and 2 for the value
+# of the shape function
+_B_PATTERN_ = np.array(
+    [
+        [0, 0, 0, 1],
+        [1, 1, 1, 1],
+        [2, 0, 1, 1],
+        [2, 1, 0, 1],
+        [3, 4, 0, 1],
+        [4, 3, 1, -1],
+        [5, 3, 0, -1],
+        [5, 4, 1, 1],
+        [6, 2, 0, 1],
+        [6, 4, 2, 1],
+        [7, 2, 1, 1],
+        [7, 3, 2, -1],
+    ],
+    dtype=np.int64,
+)
+
+
+@njit(nogil=True, parallel=True, fastmath=True, boundscheck=False, cache=__cache)
+def strain_displacement_matrix(
+    shp: ndarray, dshp: ndarray, jac: ndarray, nN: int
+) -> ndarray:
+    # compiled for every number of nodes, for fixed trip counts in the loops
+    literally(nN)
     nE = jac.shape[0]
-    nP, nN = dshp.shape[:2]
+    nP = dshp.shape[0]
     nTOTV = nN * _NDOFN_
+    nB = _B_PATTERN_.shape[0]
     B = np.zeros((nE, nP, _NSTRE_, nTOTV), dtype=dshp.dtype)
     for iE in prange(nE):
-        for iP in prange(nP):
-            gdshp = dshp[iP] @ np.linalg.inv(jac[iE, iP])
-            for i in prange(nN):
-                B[iE, iP, 0, 0 + i * _NDOFN_] = gdshp[i, 0]
-                B[iE, iP, 1, 1 + i * _NDOFN_] = gdshp[i, 1]
-                B[iE, iP, 2, 0 + i * _NDOFN_] = gdshp[i, 1]
-                B[iE, iP, 2, 1 + i * _NDOFN_] = gdshp[i, 0]
-                B[iE, iP, 3, 4 + i * _NDOFN_] = gdshp[i, 0]
-                B[iE, iP, 4, 3 + i * _NDOFN_] = -gdshp[i, 1]
-                B[iE, iP, 5, 3 + i * _NDOFN_] = -gdshp[i, 0]
-                B[iE, iP, 5, 4 + i * _NDOFN_] = gdshp[i, 1]
-                B[iE, iP, 6, 2 + i * _NDOFN_] = gdshp[i, 0]
-                B[iE, iP, 6, 4 + i * _NDOFN_] = shp[iP, i]
-                B[iE, iP, 7, 2 + i * _NDOFN_] = gdshp[i, 1]
-                B[iE, iP, 7, 3 + i * _NDOFN_] = -shp[iP, i]
+        g = np.zeros(3, dtype=dshp.dtype)
+        for iP in range(nP):
+            i00, i01, i10, i11, _ = _inv2(jac[iE, iP])
+            for i in range(nN):
+                g[0] = dshp[iP, i, 0] * i00 + dshp[iP, i, 1] * i10
+                g[1] = dshp[iP, i, 0] * i01 + dshp[iP, i, 1] * i11
+                g[2] = shp[iP, i]
+                for k in range(nB):
+                    r, d, src, sgn = _B_PATTERN_[k]
+                    B[iE, iP, r, d + i * _NDOFN_] = sgn * g[src]
     return B
 
 
+@njit(nogil=True, parallel=True, fastmath=True, cache=__cache)
+def elastic_stiffness_matrix(
+    shp: ndarray,  # (nP, nN)
+    dshp: ndarray,  # (nP, nN, 2)
+    jac: ndarray,  # (nE, nP, 2, 2)
+    weights: ndarray,  # (nP,)
+    D: ndarray,  # (nE, nSTRE, nSTRE)
+    mask: ndarray,  # (nSTRE,)
+    nN: int,  # number of nodes per cell
+) -> Tuple[ndarray, ndarray]:
+    """
+    Returns the stiffness matrices and the integrated strain-displacement
+    matrices of several cells, without creating the strain-displacement
+    matrices at the Gauss points. Only the nonzero entries of the
+    strain-displacement matrices are evaluated and used, according to
+    the pattern in `_B_PATTERN_`. The strain components are weighted with
+    the values of 'mask', which is used for selective integration.
+    The kernel is compiled for every number of nodes 'nN', which makes
+    the trip counts of the nodal loops compile-time constants.
+    """
+    literally(nN)
+    nE = jac.shape[0]
+    nP = dshp.shape[0]
+    nTOTV = nN * _NDOFN_
+    nB = _B_PATTERN_.shape[0]
+    K = np.zeros((nE, nTOTV, nTOTV), dtype=D.dtype)
+    B = np.zeros((nE, _NSTRE_, nTOTV), dtype=D.dtype)
+    for iE in prange(nE):
+        Dm = np.zeros((_NSTRE_, _NSTRE_), dtype=D.dtype)
+        for r in range(_NSTRE_):
+            for s in range(_NSTRE_):
+                Dm[r, s] = D[iE, r, s] * mask[r] * mask[s]
+        g = np.zeros(3, dtype=D.dtype)
+        vals = np.zeros((nN, nB), dtype=D.dtype)
+        DB = np.zeros((nN, _NSTRE_, _NDOFN_), dtype=D.dtype)
+        for iP in range(nP):
+            i00, i01, i10, i11, dj = _inv2(jac[iE, iP])
+            wdj = weights[iP] * dj
+            for i in range(nN):
+                g[0] = dshp[iP, i, 0] * i00 + dshp[iP, i, 1] * i10
+                g[1] = dshp[iP, i, 0] * i01 + dshp[iP, i, 1] * i11
+                g[2] = shp[iP, i]
+                for k in range(nB):
+                    vals[i, k] = _B_PATTERN_[k, 3] * g[_B_PATTERN_[k, 2]]
+            # D @ B for every node
+            DB[:, :, :] = 0.0
+            for j in range(nN):
+                for k in range(nB):
+                    s, d = _B_PATTERN_[k, 0], _B_PATTERN_[k, 1]
+                    v = vals[j, k]
+                    for r in range(_NSTRE_):
+                        DB[j, r, d] += Dm[r, s] * v
+            # B.T @ D @ B
+            for i in range(nN):
+                for k in range(nB):
+                    r, a = _B_PATTERN_[k, 0], _B_PATTERN_[k, 1]
+                    c = vals[i, k] * wdj
+                    ia = i * _NDOFN_ + a
+                    B[iE, r, ia] += c * mask[r]
+                    for j in range(nN):
+                        for b in range(_NDOFN_):
+                            K[iE, ia, j * _NDOFN_ + b] += c * DB[j, r, b]
+    return K, B
+
+
 # FIXME this needs to be checked
-@njit(nogil=True, parallel=True, cache=__cache)
-def material_strains(model_strains: ndarray, z: float, t: float) -> ndarray:
+def material_strains(model_strains: ndarray, z: float, t: ndarray) -> ndarray:
     nE, nP = model_strains.shape[:2]
     res = np.zeros((nE, nP, _NHOOKE_), dtype=model_strains.dtype)
     res[:, :, :3] = model_strains[:, :, :3] * z
-    for i in prange(nE):
-        res[i, :, 3:] = (5 / 4) * (1 - 4 * (z / t[i]) ** 2) * model_strains[i, :, 3:]
+    factor = (5 / 4) * (1 - 4 * (z / t) ** 2)
+    res[:, :, 3:] = factor[:, None, None] * model_strains[:, :, 3:]
     return res
 
 
-@njit(nogil=True, parallel=True, cache=__cache)
 def HMH(estrs: np.ndarray) -> ndarray:
-    nE, nP = estrs.shape[:2]
-    res = np.zeros((nE, nP), dtype=estrs.dtype)
-    for iE in prange(nE):
-        for jNE in prange(nP):
-            res[iE, jNE] = HMH_S(estrs[iE, jNE])
-    return res
+    return HMH_S_bulk(estrs)
 
 
 @njit(nogil=True, parallel=True, cache=__cache)
@@ -88,7 +171,17 @@ class MindlinShell(Surface):
     def strain_displacement_matrix(
         cls, *_, shp=None, dshp=None, jac=None, **__
     ) -> ndarray:
-        return strain_displacement_matrix(shp, dshp, jac)
+        return strain_displacement_matrix(shp, dshp, jac, dshp.shape[1])
+
+    @classmethod
+    def integrate_stiffness_matrix(
+        cls, *_, shp=None, dshp=None, jac=None, weights=None, D=None, inds=None, **__
+    ) -> Tuple[ndarray, ndarray]:
+        mask = np.ones(_NSTRE_, dtype=D.dtype)
+        if inds is not None:
+            mask[~np.isin(np.arange(_NSTRE_), inds)] = 0.0
+        nN = dshp.shape[1]
+        return elastic_stiffness_matrix(shp, dshp, jac, weights, D, mask, nN)
 
     @classmethod
     def HMH(cls, data, *_, **__) -> ndarray:
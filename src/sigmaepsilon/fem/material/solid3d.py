@@ -44,12 +44,12 @@ def strain_displacement_matrix(dshp: ndarray, jac: ndarray) -> ndarray:
     return B
 
 
-@njit(nogil=True, parallel=True, cache=__cache)
+@njit(nogil=True, cache=__cache)
 def HMH_3d_bulk_multi(estrs: np.ndarray) -> ndarray:
     nE, nP = estrs.shape[:2]
     res = np.zeros((nE, nP), dtype=estrs.dtype)
-    for iE in prange(nE):
-        for jNE in prange(nP):
+    for iE in range(nE):
+        for jNE in range(nP):
             res[iE, jNE] = HMH_3d(estrs[iE, jNE])
     return res
 
@@ -1,11 +1,18 @@
-from typing import Union, List, Iterable, Collection
+from typing import Union, List, Iterable, Collection, Callable, Tuple, Dict
 import logging
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-from scipy.sparse import coo_matrix
+from scipy.sparse import coo_matrix, spmatrix
+import numba
+from numba import njit, prange
 import numpy as np
 from numpy import ndarray
+from numpy.typing import DTypeLike
 
-from neumann import atleast3d
+from neumann import atleast3d, ascont
+from neumann.linalg import ReferenceFrame
 from neumann.linalg.sparse import JaggedArray
 
 from polymesh import PolyData
@@ -20,6 +27,196 @@ from .cells import TET4, TET10, H8, H27, Q4_M, Q9_M, CST_M, LST_M, FiniteElement
 from .metamesh import ABC_FemMesh
 from .constants import DEFAULT_DIRICHLET_PENALTY
 
+__cache = True
+
+
+@njit(parallel=True, cache=__cache)
+def _launch_numba_threads() -> int:
+    n = 0
+    for i in prange(2):
+        n += i
+    return n
+
+
+@lru_cache(maxsize=1)
+def _numba_is_threadsafe() -> bool:
+    """
+    Returns True if the threading layer of Numba can be entered from several
+    threads at the same time. This is only true for the 'tbb' and 'omp'
+    layers, the default 'workqueue' layer aborts the process if parallel
+    kernels are called concurrently. The layer is only selected when the
+    first parallel kernel is launched, hence a trivial one is called first.
+    """
+    _launch_numba_threads()
+    return numba.threading_layer() in ("tbb", "omp")
+
+
+def _map_blocks(fnc: Callable, blocks: Iterable, max_workers: int = None) -> list:
+    """
+    Evaluates a function on several blocks, optionally on a pool of threads,
+    and returns the results in the order of the blocks. The blocks are
+    evaluated serially if the threading layer of Numba is not threadsafe.
+    """
+    blocks = list(blocks)
+    if max_workers is None or max_workers < 2 or len(blocks) < 2:
+        return [fnc(b) for b in blocks]
+    if not _numba_is_threadsafe():
+        logging.warning(
+            "The threading layer of Numba is not threadsafe, "
+            "'max_workers' is ignored. Use the 'tbb' or 'omp' layers."
+        )
+        return [fnc(b) for b in blocks]
+    max_workers = min(max_workers, len(blocks))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fnc, blocks))
+
+
+def _concatenate_coo(matrices: Iterable[coo_matrix]) -> coo_matrix:
+    """
+    Merges sparse matrices of the same shape into one coo matrix by
+    concatenating their entries. Duplicate entries are not summed.
+    """
+    matrices = [m.tocoo() for m in matrices]
+    shape = matrices[0].shape
+    nnz = sum(m.nnz for m in matrices)
+    # cast the indices to the index type scipy would choose anyway, so that
+    # the constructor of coo_matrix doesn't have to copy them again
+    idx_dtype = np.int64 if max(shape) > np.iinfo(np.int32).max else np.int32
+    row = np.concatenate([m.row for m in matrices], out=np.empty(nnz, idx_dtype))
+    col = np.concatenate([m.col for m in matrices], out=np.empty(nnz, idx_dtype))
+    data = np.concatenate([m.data for m in matrices])
+    return coo_matrix((data, (row, col)), shape=shape, copy=False)
+
+
+_SPARSE_FORMATS = ("coo", "csr", "csc", "bsr", "lil", "dok", "dia")
+
+
+def _finalize_sparse(
+    A: coo_matrix,
+    *,
+    format: str = "coo",
+    eliminate_zeros: bool = True,
+    sum_duplicates: bool = True,
+) -> spmatrix:
+    """
+    Converts a coo matrix to the requested format. For formats other than 'coo',
+    duplicate entries are summed by a conversion to 'csr' or 'csc', where the
+    zeros are eliminated before converting to the final format.
+    """
+    if format not in _SPARSE_FORMATS:
+        raise ValueError(
+            f"Invalid sparse format '{format}', "
+            f"it must be one of {', '.join(_SPARSE_FORMATS)}."
+        )
+    if format != "coo":
+        A = A.tocsc() if format == "csc" else A.tocsr()
+        if eliminate_zeros:
+            A.eliminate_zeros()
+        return A.asformat(format)
+    if eliminate_zeros:
+        A.eliminate_zeros()
+    if sum_duplicates:
+        A.sum_duplicates()
+    return A
+
+
+def _same_data(a: ndarray, b: ndarray) -> bool:
+    """
+    Returns True if two arrays are views of the same memory with the same layout.
+    """
+    return (
+        a.__array_interface__["data"][0] == b.__array_interface__["data"][0]
+        and a.shape == b.shape
+        and a.strides == b.strides
+        and a.dtype == b.dtype
+    )
+
+
+class _PostprocessContext:
+    """
+    Memoizes the stacked data of groups of blocks, that is shared by
+    consecutive postprocessing calls. See :func:`FemMesh.postprocess_context`.
+
+    The cached data is dropped if the topology version of the mesh changes,
+    or if the dof solution of the root mesh is replaced, eg. by a new analysis.
+    Changes made in place to the point data or to the cells are not detected.
+
+    Note
+    ----
+    The inverses of the jacobian matrices are cached as part of the
+    strain-displacement matrices, which are cached instead of them.
+    """
+
+    def __init__(self, mesh: "FemMesh"):
+        self.mesh = mesh
+        self._cache = {}
+        self._state = None
+
+    def validate(self) -> None:
+        """
+        Drops the cached data if the topology of the mesh or the dof solution
+        has changed since the last call.
+        """
+        version = self.mesh._topology_version
+        dofsol = self.mesh.root().pointdata.dofsol
+        if self._state is not None:
+            version_, dofsol_ = self._state
+            if version_ != version or not _same_data(dofsol_, dofsol):
+                self._cache.clear()
+        # the solution is kept alive, so that its memory can't be reused
+        self._state = (version, dofsol)
+
+    def _memo_(self, key: tuple, fnc: Callable):
+        if key not in self._cache:
+            self._cache[key] = fnc()
+        return self._cache[key]
+
+    def dofsol(self, blocks: Iterable["FemMesh"]) -> ndarray:
+        """
+        Returns the stacked dof solution of the cells of the blocks.
+        """
+        blocks = tuple(blocks)
+        key = ("dofsol",) + tuple(id(b) for b in blocks)
+        return self._memo_(
+            key,
+            lambda: np.concatenate([b.cd.dof_solution(flatten=True) for b in blocks]),
+        )
+
+    def local_coordinates(self, blocks: Iterable["FemMesh"]) -> ndarray:
+        """
+        Returns the stacked local coordinates of the cells of the blocks.
+        """
+        blocks = tuple(blocks)
+        key = ("ecoords",) + tuple(id(b) for b in blocks)
+        return self._memo_(
+            key,
+            lambda: np.concatenate([b.cd.local_coordinates() for b in blocks]),
+        )
+
+    def strain_displacement_matrix(
+        self, blocks: Iterable["FemMesh"], points: ndarray
+    ) -> ndarray:
+        """
+        Returns the stacked strain-displacement matrices of the cells of the
+        blocks, evaluated at the points of evaluation.
+        """
+        blocks = tuple(blocks)
+        points = np.asarray(points)
+        key = ("B", points.shape, points.tobytes()) + tuple(id(b) for b in blocks)
+        cd = blocks[0].cd
+
+        def foo() -> ndarray:
+            dshp = cd.shape_function_derivatives(points)
+            jac = cd.jacobian_matrix(dshp=dshp, ecoords=self.local_coordinates(blocks))
+            shp = cd.shape_function_values(points)
+            return cd.strain_displacement_matrix(shp=shp, dshp=dshp, jac=jac)
+
+        return self._memo_(key, foo)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._state = None
+
 
 class FemMesh(PolyData, ABC_FemMesh):
     """
@@ -66,6 +263,10 @@ class FemMesh(PolyData, ABC_FemMesh):
     ):
         point_fields = {} if point_fields is None else point_fields
         cell_fields = {} if cell_fields is None else cell_fields
+        self._cellblocks_cache = None
+        self._cellblocks_by_type_cache = None
+        self._assembly_pattern = None
+        self._topology_version = 0
         super().__init__(
             *args, point_fields=point_fields, cell_fields=cell_fields, **kwargs
         )
@@ -73,6 +274,14 @@ class FemMesh(PolyData, ABC_FemMesh):
     def __getitem__(self, key) -> "FemMesh":
         return super().__getitem__(key)
 
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.invalidate_cellblocks_cache()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.invalidate_cellblocks_cache()
+
     @property
     def pd(self) -> PointData:
         """
@@ -102,14 +311,120 @@ class FemMesh(PolyData, ABC_FemMesh):
         """
         return filter(lambda i: i.celldata is not None, self.blocks(*args, **kwargs))
 
+    @property
+    def cellblocks_inclusive(self) -> Tuple["FemMesh"]:
+        """
+        Returns the blocks with cell data, including the instance itself, as a
+        tuple. The result is cached and the cache is invalidated if a block is
+        added to or removed from the mesh or any of its subblocks.
+        """
+        if self._cellblocks_cache is None:
+            self._cellblocks_cache = tuple(self.cellblocks(inclusive=True))
+        return self._cellblocks_cache
+
+    @contextmanager
+    def postprocess_context(self):
+        """
+        Returns a context manager for consecutive postprocessing calls. The
+        yielded object memoizes the stacked dof solutions, local coordinates
+        and strain-displacement matrices of the blocks, and can be passed to
+        :func:`strains`, :func:`internal_forces` and
+        :func:`sigmaepsilon.fem.structure.Structure.internal_forces_batched`
+        with the 'ctx' argument. The cached data is released on exit.
+
+        Example
+        -------
+        >>> with mesh.postprocess_context() as ctx:
+        ...     strains = mesh.strains(ctx=ctx)
+        ...     forces = structure.internal_forces_batched(ctx=ctx)
+        """
+        ctx = _PostprocessContext(self)
+        try:
+            yield ctx
+        finally:
+            ctx.clear()
+
+    def _grouped_blocks_by_type(self) -> Dict[type, Tuple["FemMesh"]]:
+        """
+        Returns the blocks with cell data grouped by the class of their cells,
+        in the order of :func:`cellblocks_inclusive`. The result is cached the
+        same way the blocks are.
+        """
+        if self._cellblocks_by_type_cache is None:
+            groups = {}
+            for b in self.cellblocks_inclusive:
+                groups.setdefault(b.cd.__class__, []).append(b)
+            groups = {k: tuple(v) for k, v in groups.items()}
+            self._cellblocks_by_type_cache = groups
+        return self._cellblocks_by_type_cache
+
+    def invalidate_cellblocks_cache(self) -> None:
+        """
+        Invalidates the cached blocks and the cached sparsity patterns of the
+        instance and all of its parents, by bumping their topology versions.
+        Call it if the structure or the topology of the mesh changes in a way
+        that bypasses item assignment or deletion.
+        """
+        mesh = self
+        while mesh is not None:
+            if isinstance(mesh, FemMesh):
+                mesh._cellblocks_cache = None
+                mesh._cellblocks_by_type_cache = None
+                mesh._topology_version += 1
+            mesh = getattr(mesh, "parent", None)
+
+    def _assemble_coo_(
+        self,
+        blocks: Iterable["FemMesh"],
+        method: str,
+        max_workers: int = None,
+        **kwargs,
+    ) -> coo_matrix:
+        """
+        Assembles the sparse matrix of the blocks, returned by the method
+        of the cells with the name 'method'. The row and column indices are
+        only calculated at the first call for every method and reused afterwards,
+        as long as the topology version of the mesh and the size of the system
+        are unchanged. Extra keyword arguments are forwarded to the cells.
+        """
+        blocks = list(blocks)
+        root = self.root()
+        NDOFN = root.NDOFN
+        N = len(root.pointdata) * NDOFN
+        version = self._topology_version
+        patterns = self._assembly_pattern
+        if patterns is None:
+            patterns = self._assembly_pattern = {}
+
+        pattern = patterns.get(method, None)
+        if pattern is not None:
+            row, col, shape, version_ = pattern
+            nnz = sum(len(b.cd) * (b.cd.NNODE * NDOFN) ** 2 for b in blocks)
+            if version_ == version and shape == (N, N) and nnz == len(row):
+
+                def foo(b: FemMesh):
+                    return getattr(b.cd, method)(transform=True, **kwargs).ravel()
+
+                data = np.concatenate(_map_blocks(foo, blocks, max_workers))
+                return coo_matrix((data, (row, col)), shape=shape, copy=False)
+
+        def foo(b: FemMesh):
+            return getattr(b.cd, method)(sparse=True, transform=True, **kwargs)
+
+        A = _concatenate_coo(_map_blocks(foo, blocks, max_workers))
+        row, col = A.row.copy(), A.col.copy()
+        # the pattern is shared by the returned matrices, protect it
+        row.setflags(write=False)
+        col.setflags(write=False)
+        patterns[method] = (row, col, A.shape, version)
+        return A
+
     def is_jagged(self) -> bool:
         """
         Returns True if the mesh is jagged, i.e. if it consists of blocks with
         inconsistent matrix shapes, thus prohibiting bulk calculations.
         """
-        cell_class_id = map(
-            lambda b: id(b.cd.__class__), self.cellblocks(inclusive=True)
-        )
+        cell_class_id = map(lambda b: id(b.cd.__class__), self.cellblocks_inclusive)
         return len(set(cell_class_id)) > 1
 
     def is_regular(self, **kwargs) -> bool:
@@ -139,7 +454,7 @@ class FemMesh(PolyData, ABC_FemMesh):
         if points is None and cells is None:
             return super().cells_coords(*args, **kwargs)
         else:
-            blocks = self.cellblocks(inclusive=True)
+            blocks = self.cellblocks_inclusive
             kwargs.update(points=points)
             if cells is not None:
                 kwargs.update(cells=cells)
@@ -190,7 +505,7 @@ class FemMesh(PolyData, ABC_FemMesh):
             else:
                 return gnum
         else:
-            gnum = np.vstack([arr.to_numpy() for arr in gnum])
+            gnum = np.concatenate([arr.to_numpy() for arr in gnum], axis=0)
             if return_inds:
                 inds = list(map(lambda i: i.celldata.id, blocks))
                 return gnum, np.concatenate(inds)
@@ -202,16 +517,16 @@ class FemMesh(PolyData, ABC_FemMesh):
         Returns element fixity data.
         """
         fixity = []
-        for b in self.cellblocks(inclusive=True):
+        for b in self.cellblocks_inclusive:
             if b.has_fixity:
                 fixity.append(b.cd.fixity.astype(float))
             else:
                 nE, nNE, nDOF = len(b.cd), b.cd.NNODE, self.NDOFN
-                fixity.append(np.ones(nE, nNE, nDOF))
-        return np.vstack(fixity)
+                fixity.append(np.ones((nE, nNE, nDOF)))
+        return np.concatenate(fixity, axis=0)
 
     def direction_cosine_matrix(self, target: str = "global"):
-        blocks = self.cellblocks(inclusive=True)
+        blocks = self.cellblocks_inclusive
 
         def foo(b: FemMesh):
             return b.cd.direction_cosine_matrix(target=target)
@@ -225,8 +540,11 @@ class FemMesh(PolyData, ABC_FemMesh):
         sum_duplicates: bool = True,
         sparse: bool = False,
         transform: bool = True,
+        format: str = "coo",
+        max_workers: int = None,
+        dtype: DTypeLike = None,
         **kwargs,
-    ) -> Union[ndarray, coo_matrix]:
+    ) -> Union[ndarray, spmatrix]:
         """
         Returns the elastic stiffness matrix in dense or sparse format.
 
@@ -237,32 +555,52 @@ class FemMesh(PolyData, ABC_FemMesh):
         eliminate_zeros : bool, Optional
             Eliminates zero entries. Only if 'sparse' is True. Default is True.
         sum_duplicates : bool, Optional
-            Sums duplicate entries. Only if 'sparse' is True. Default is True.
+            Sums duplicate entries. Only if 'sparse' is True and 'format' is 'coo'.
+            Default is True.
         transform : bool, Optional
             If True, local matrices are transformed to the global frame.
             Default is True.
+        format : str, Optional
+            The format of the sparse result, one of 'coo', 'csr', 'csc', 'bsr',
+            'lil', 'dok' or 'dia'. For formats other than 'coo', duplicate entries
+            are summed during the conversion, which is much cheaper than summing
+            them in coo format. Only if 'sparse' is True. Default is 'coo'.
+        max_workers : int, Optional
+            If provided, the sparse matrices of the blocks are calculated on a pool
+            of threads of this size. Only if 'sparse' is True. Default is None.
+
+            .. warning::
+               The cell kernels are parallel Numba functions, which may only be
+               called concurrently with the 'tbb' or 'omp' threading layers of
+               Numba. With any other layer (eg. the default 'workqueue'), the
+               option is ignored and the blocks are evaluated serially.
+        dtype : DTypeLike, Optional
+            The floating point type of the integration kernels of the cells, eg.
+            `numpy.float32`. The inputs of the kernels are calculated in double
+            precision and converted, the results are always returned and stored in
+            double precision, hence this does not reduce memory usage. Only has an
+            effect if the matrices are not yet calculated. Default is None.
 
         Returns
         -------
-        numpy.ndarray or scipy.sparse.coo_matrix
+        numpy.ndarray or scipy.sparse.spmatrix
         """
-        blocks = self.cellblocks(inclusive=True)
+        blocks = self.cellblocks_inclusive
         if sparse:
             assert transform, "Must transform for sparse output."
-
-            def foo(b: FemMesh):
-                return b.cd.elastic_stiffness_matrix(sparse=True, transform=True)
-
-            K = np.sum(list(map(foo, blocks))).tocoo()
-            if eliminate_zeros:
-                K.eliminate_zeros()
-            if sum_duplicates:
-                K.sum_duplicates()
-            return K
+            K = self._assemble_coo_(
+                blocks, "elastic_stiffness_matrix", max_workers, dtype=dtype
+            )
+            return _finalize_sparse(
+                K,
+                format=format,
+                eliminate_zeros=eliminate_zeros,
+                sum_duplicates=sum_duplicates,
+            )
         else:
 
             def foo(b: FemMesh):
-                return b.cd.elastic_stiffness_matrix(transform=transform)
+                return b.cd.elastic_stiffness_matrix(transform=transform, dtype=dtype)
 
             if kwargs.get("_jagged", self.is_jagged()):
                 shaper = map(
@@ -270,9 +608,8 @@ class FemMesh(PolyData, ABC_FemMesh):
                     map(foo, blocks),
                 )
                 mapper = map(lambda x: JaggedArray(x, force_numpy=False), shaper)
-            else:
-                mapper = map(foo, blocks)
-            return np.vstack(list(mapper))
+                return np.vstack(list(mapper))
+            return np.vstack(list(map(foo, blocks)))
 
     def masses(self, *args, **kwargs) -> ndarray:
         """
@@ -280,11 +617,7 @@ class FemMesh(PolyData, ABC_FemMesh):
         """
         blocks = self.cellblocks(*args, inclusive=True, **kwargs)
 
-        def foo(b: FemMesh):
-            return b.cd.masses()
-
-        vmap = map(foo, blocks)
-        return np.concatenate(list(vmap))
+        return np.concatenate([b.cd.masses() for b in blocks])
 
     def mass(self, *args, **kwargs) -> float:
         """
@@ -299,8 +632,10 @@ class FemMesh(PolyData, ABC_FemMesh):
         sum_duplicates: bool = True,
         sparse: bool = False,
         transform: bool = True,
+        format: str = "coo",
+        max_workers: int = None,
         **kwargs,
-    ) -> Union[ndarray, coo_matrix]:
+    ) -> Union[ndarray, spmatrix]:
         """
         Returns the stiffness-consistent mass matrix as a dense or a sparse
         matrix.
@@ -312,29 +647,41 @@ class FemMesh(PolyData, ABC_FemMesh):
         eliminate_zeros : bool, Optional
             Eliminates zero entries. Only if 'sparse' is True. Default is True.
         sum_duplicates : bool, Optional
-            Sums duplicate entries. Only if 'sparse' is True. Default is True.
+            Sums duplicate entries. Only if 'sparse' is True and 'format' is 'coo'.
+            Default is True.
         transform : bool, Optional
             If True, local matrices are transformed to the global frame.
             Default is True.
+        format : str, Optional
+            The format of the sparse result, one of 'coo', 'csr', 'csc', 'bsr',
+            'lil', 'dok' or 'dia'. For formats other than 'coo', duplicate entries
+            are summed during the conversion, which is much cheaper than summing
+            them in coo format. Only if 'sparse' is True. Default is 'coo'.
+        max_workers : int, Optional
+            If provided, the sparse matrices of the blocks are calculated on a pool
+            of threads of this size. Only if 'sparse' is True. Default is None.
+
+            .. warning::
+               The cell kernels are parallel Numba functions, which may only be
+               called concurrently with the 'tbb' or 'omp' threading layers of
+               Numba. With any other layer (eg. the default 'workqueue'), the
+               option is ignored and the blocks are evaluated serially.
 
         Returns
         -------
-        numpy.ndarray or scipy.sparse.coo_matrix
+        numpy.ndarray or scipy.sparse.spmatrix
             The mass matrix as a 3d dense or a 2d sparse array.
         """
-        blocks = self.cellblocks(inclusive=True)
+        blocks = self.cellblocks_inclusive
         if sparse:
             assert transform, "Must transform for sparse output."
-
-            def foo(b: FemMesh):
-                return b.cd.consistent_mass_matrix(sparse=True, transform=True)
-
-            M = np.sum(list(map(foo, blocks))).tocoo()
-            if eliminate_zeros:
-                M.eliminate_zeros()
-            if sum_duplicates:
-                M.sum_duplicates()
-            return M
+            M = self._assemble_coo_(blocks, "consistent_mass_matrix", max_workers)
+            return _finalize_sparse(
+                M,
+                format=format,
+                eliminate_zeros=eliminate_zeros,
+                sum_duplicates=sum_duplicates,
+            )
         else:
 
             def foo(b: FemMesh):
@@ -346,9 +693,8 @@ class FemMesh(PolyData, ABC_FemMesh):
                     map(foo, blocks),
                 )
                 mapper = map(lambda x: JaggedArray(x, force_numpy=False), shaper)
-            else:
-                mapper = map(foo, blocks)
-            return np.vstack(list(mapper))
+                return np.vstack(list(mapper))
+            return np.vstack(list(map(foo, blocks)))
 
     def mass_matrix(
         self, *, eliminate_zeros: bool = True, sum_duplicates: bool = True, **kwargs
@@ -481,7 +827,12 @@ class FemMesh(PolyData, ABC_FemMesh):
         return res
 
     def cell_load_vector(
-        self, *, transform: bool = True, assemble: bool = False, **kwargs
+        self,
+        *,
+        transform: bool = True,
+        assemble: bool = False,
+        strain_loads: dict = None,
+        **kwargs,
     ) -> ndarray:
         """
         Returns the nodal load vector from body and strain loads.
@@ -494,6 +845,10 @@ class FemMesh(PolyData, ABC_FemMesh):
         transform : bool, Optional
             If True, local matrices are transformed to the global frame.
             Default is False.
+        strain_loads : dict, Optional
+            Strain loads for some of the blocks, keyed by the ids of the blocks.
+            If provided, these override the values stored in the database of
+            the cells, without being stored. Default is None.
 
         Returns
         -------
@@ -502,15 +857,31 @@ class FemMesh(PolyData, ABC_FemMesh):
         """
         if assemble:
             assert transform, "Must transform before assembly."
-        blocks = list(self.cellblocks(inclusive=True))
+        blocks = self.cellblocks_inclusive
+        # load vectors of the blocks calculated in advance, eg. during condensation
+        cell_loads = kwargs.pop("_cell_loads", None)
+        cell_loads = {} if cell_loads is None else cell_loads
         params = dict(transform=transform, assemble=assemble)
         params.update(**kwargs)
 
+        strain_loads = {} if strain_loads is None else strain_loads
+
         def foo(b: FemMesh):
-            return b.cd.load_vector(**params)
+            return b.cd.load_vector(
+                strain_loads=strain_loads.get(id(b)),
+                _f=cell_loads.get(id(b)),
+                **params,
+            )
 
         if assemble:
-            return sum(map(foo, blocks))
+            # the assembled vectors are fresh arrays, accumulate them in place
+            res = None
+            for b in blocks:
+                if res is None:
+                    res = foo(b)
+                else:
+                    res += foo(b)
+            return res
         else:
             return np.vstack(list(map(foo, blocks)))
 
@@ -519,7 +890,7 @@ class FemMesh(PolyData, ABC_FemMesh):
         Calculates approximate solution of the primary variables as a list
         of arrays for each block in the mesh.
         """
-        blocks = self.cellblocks(inclusive=True)
+        blocks = self.cellblocks_inclusive
         dofsol = self.root().pointdata.dofsol
 
         def foo(b: FemMesh):
@@ -532,9 +903,24 @@ class FemMesh(PolyData, ABC_FemMesh):
         Performs static condensation of the system equations to account for
         cell fixity. Returns the mesh object for continuation.
         """
-        [b.cd.condensate() for b in self.cellblocks(inclusive=True)]
+        self._condensate_cell_fixity_()
         return self
 
+    def _condensate_cell_fixity_(self, strain_loads: dict = None) -> Dict[int, ndarray]:
+        """
+        Performs static condensation of the system equations to account for
+        cell fixity. The load vectors of the blocks with strain loads are
+        condensed along with the stiffness matrices, and returned in a dictionary
+        keyed by the ids of the blocks, without being stored in the database.
+        """
+        strain_loads = {} if strain_loads is None else strain_loads
+        result = {}
+        for b in self.cellblocks_inclusive:
+            f = b.cd.condensate(strain_loads=strain_loads.get(id(b)))
+            if f is not None:
+                result[id(b)] = f
+        return result
+
     def nodal_dof_solution(self, *, flatten: bool = False, **kw) -> ndarray:
         """
         Returns nodal degree of freedom solution.
@@ -587,14 +973,20 @@ class FemMesh(PolyData, ABC_FemMesh):
             boc = self.blocks_of_cells(i=cells)
             return {cid: f(boc[cid], cid) for cid in cells}
         else:
-            blocks = self.cellblocks(inclusive=True)
+            blocks = self.cellblocks_inclusive
 
             def foo(b: FemMesh):
                 return b.cd.dof_solution(*args, **kwargs)
 
             return np.vstack(list(map(foo, blocks)))
 
-    def strains(self, *args, cells: Iterable = None, **kwargs) -> ndarray:
+    def strains(
+        self,
+        *args,
+        cells: Iterable = None,
+        ctx: _PostprocessContext = None,
+        **kwargs,
+    ) -> ndarray:
         """
         Returns strains for each cell or just some.
 
@@ -606,6 +998,9 @@ class FemMesh(PolyData, ABC_FemMesh):
             being the keys. Default is None.
         flatten: bool, Optional
             If True, nodal results are flattened. Default is True.
+        ctx : object, Optional
+            A context returned by :func:`postprocess_context`, to reuse data
+            between consecutive calls. Only if 'cells' is None. Default is None.
 
         Returns
         -------
@@ -621,12 +1016,53 @@ class FemMesh(PolyData, ABC_FemMesh):
             boc = self.blocks_of_cells(i=cells)
             return {cid: f(boc[cid], cid) for cid in cells}
         else:
-            blocks = self.cellblocks(inclusive=True)
-
-            def foo(b: FemMesh):
-                return b.cd.strains(*args, **kwargs)
+            return self._strains_by_type_(*args, ctx=ctx, **kwargs)
 
-            return np.vstack(list(map(foo, blocks)))
+    def _strains_by_type_(
+        self,
+        *args,
+        points: Iterable = None,
+        rng: Iterable = None,
+        ctx: _PostprocessContext = None,
+        **kwargs,
+    ) -> ndarray:
+        """
+        Returns the strains of all cells. The data of the blocks with the same
+        type of cells is stacked and evaluated with one call, instead of one
+        call for every block. Extra arguments are forwarded to the cells that
+        are evaluated one by one, and ignored otherwise, like the cells do.
+        """
+        ctx = _PostprocessContext(self) if ctx is None else ctx
+        ctx.validate()
+        groups = self._grouped_blocks_by_type()
+        result = {}
+        for cell_class, blocks in groups.items():
+            custom = cell_class.strains is not FiniteElement.strains
+            if cell_class.NDIM == 1 or custom:
+                for b in blocks:
+                    result[id(b)] = b.cd.strains(
+                        *args, points=points, rng=rng, **kwargs
+                    )
+                continue
+            cd = blocks[0].cd
+            _points = np.array(cd.lcoords()) if points is None else points
+            strains = cd._strains_bulk_(
+                dofsol=ctx.dofsol(blocks),
+                shp=cd.shape_function_values(_points),
+                dshp=cd.shape_function_derivatives(_points),
+                ecoords=ctx.local_coordinates(blocks),
+                B=ctx.strain_displacement_matrix(blocks, _points),
+            )  # (nE, nRHS, nP, nSTRE)
+            strains = ascont(np.moveaxis(strains, 1, -1))  # (nE, nP, nSTRE, nRHS)
+            if len(groups) == 1:
+                # the stacked data is already in the order of the blocks
+                return strains
+            i_start = 0
+            for b in blocks:
+                i_stop = i_start + len(b.cd)
+                result[id(b)] = strains[i_start:i_stop]
+                i_start = i_stop
+        return np.vstack([result[id(b)] for b in self.cellblocks_inclusive])
 
     def external_forces(
         self, *args, cells: Iterable = None, flatten: bool = True, **kwargs
@@ -657,7 +1093,7 @@ class FemMesh(PolyData, ABC_FemMesh):
             boc = self.blocks_of_cells(i=cells)
             return {cid: f(boc[cid], cid) for cid in cells}
         else:
-            blocks = self.cellblocks(inclusive=True)
+            blocks = self.cellblocks_inclusive
 
             def foo(b: FemMesh):
                 return b.cd.external_forces(*args, **kwargs)
@@ -665,7 +1101,12 @@ class FemMesh(PolyData, ABC_FemMesh):
             return np.vstack(list(map(foo, blocks)))
 
     def internal_forces(
-        self, *args, cells: Iterable = None, flatten: bool = True, **kwargs
+        self,
+        *args,
+        cells: Iterable = None,
+        flatten: bool = True,
+        ctx: _PostprocessContext = None,
+        **kwargs,
     ) -> ndarray:
         """
         Returns internal forces for each cell or a selection.
@@ -678,14 +1119,17 @@ class FemMesh(PolyData, ABC_FemMesh):
             being the keys. Default is None.
         flatten: bool, Optional
             If True, nodal results are flattened. Default is True.
+        ctx : object, Optional
+            A context returned by :func:`postprocess_context`, to reuse data
+            between consecutive calls. Only if 'cells' is None. Default is None.
 
         Returns
         -------
         numpy.ndarray or dict
             A dictionary if cell indices are specified, or a NumPy array.
         """
-        kwargs.update(flatten=flatten)
         if cells is not None:
+            kwargs.update(flatten=flatten)
 
             def f(b: FemMesh, cid: int):
                 return b.cd.internal_forces(*args, cells=[cid], **kwargs)[0]
@@ -693,12 +1137,80 @@ class FemMesh(PolyData, ABC_FemMesh):
             boc = self.blocks_of_cells(i=cells)
             return {cid: f(boc[cid], cid) for cid in cells}
         else:
-            blocks = self.cellblocks(inclusive=True)
+            blocks = self.cellblocks_inclusive
+            forces = self._internal_forces_by_type_(blocks, *args, ctx=ctx, **kwargs)
+            if flatten:
+                forces = [f.reshape(f.shape[0], -1, f.shape[-1]) for f in forces]
+            return np.vstack(forces)
 
-            def foo(b: FemMesh):
-                return b.cd.internal_forces(*args, **kwargs)
+    def _internal_forces_by_type_(
+        self,
+        blocks: Iterable["FemMesh"],
+        *args,
+        points: Iterable = None,
+        rng: Iterable = None,
+        target: Union[str, ReferenceFrame] = "local",
+        ctx: _PostprocessContext = None,
+        **kwargs,
+    ) -> List[ndarray]:
+        """
+        Returns the internal forces of the blocks as a list of arrays of shape
+        (nE, nP, nSTRE, nRHS). The data of the blocks with the same type of cells
+        is stacked and evaluated with one call, instead of one call for every
+        block. The points of evaluation are understood in the master domain of
+        the cells, except for 1d cells, where they are wrt. the range 'rng',
+        as in :func:`sigmaepsilon.fem.cells.FiniteElement.internal_forces`.
+        Extra arguments are forwarded to the cells that are evaluated one
+        by one, and ignored otherwise, like the cells do.
+        """
+        ctx = _PostprocessContext(self) if ctx is None else ctx
+        ctx.validate()
+        blocks = list(blocks)
+        result = [None] * len(blocks)
+
+        groups = {}
+        for i, block in enumerate(blocks):
+            cd = block.cd
+            custom = type(cd)._internal_forces_ is not FiniteElement._internal_forces_
+            if cd.NDIM == 1 or custom:
+                result[i] = cd.internal_forces(
+                    *args,
+                    points=points,
+                    rng=rng,
+                    flatten=False,
+                    target=target,
+                    **kwargs,
+                )
+            else:
+                groups.setdefault(cd.__class__, []).append(i)
+
+        for inds in groups.values():
+            group = [blocks[i] for i in inds]
+            cells = [b.cd for b in group]
+            cd = cells[0]
+            _points = np.array(cd.lcoords()) if points is None else points
+            forces = cd._internal_forces_bulk_(
+                dofsol=ctx.dofsol(group),
+                shp=cd.shape_function_values(_points),
+                dshp=cd.shape_function_derivatives(_points),
+                ecoords=ctx.local_coordinates(group),
+                B=ctx.strain_displacement_matrix(group, _points),
+                kinetic_strains=np.concatenate(
+                    [c.kinetic_strains(points=_points) for c in cells]
+                ),
+                D=np.concatenate(
+                    [c.elastic_material_stiffness_matrix() for c in cells]
+                ),
+            )
+            i_start = 0
+            for i, c in zip(inds, cells):
+                i_stop = i_start + len(c)
+                result[i] = c._transform_internal_forces_(
+                    forces[i_start:i_stop], target=target, cells=np.s_[:]
+                )
+                i_start = i_stop
 
-            return np.vstack(list(map(foo, blocks)))
+        return result
 
     def internal_forces_at_centers(self, *args, **kwargs) -> ndarray:
         """
@@ -708,7 +1220,7 @@ class FemMesh(PolyData, ABC_FemMesh):
         -------
         numpy.ndarray
         """
-        blocks = self.cellblocks(inclusive=True)
+        blocks = self.cellblocks_inclusive
 
         def foo(b: FemMesh):
             return b.cd.stresses_at_centers(*args, **kwargs)
@@ -1,12 +1,13 @@
-from typing import Tuple, Union, List
+from typing import Tuple, Union, List, Iterable
 
 import numpy as np
 from numpy import ndarray
-from scipy.sparse import coo_matrix
+from scipy.sparse import coo_matrix, spmatrix
 
 from neumann import repeat
+from neumann.linalg import ReferenceFrame
 
-from .mesh import FemMesh
+from .mesh import FemMesh, _PostprocessContext
 from .ebc import EssentialBoundaryCondition as EBC
 from .femsolver import StaticSolver, DynamicSolver
 from ..utils.fem.preproc import assemble_load_vector
@@ -168,8 +169,9 @@ class Structure:
         penalize: bool = False,
         sparse: bool = False,
         transform: bool = False,
+        format: str = "coo",
         **kwargs
-    ) -> Union[ndarray, coo_matrix]:
+    ) -> Union[ndarray, spmatrix]:
         """
         Returns the elastic stiffness matrix of the structure with dense or
         sparse layout.
@@ -184,22 +186,29 @@ class Structure:
         transform : bool, Optional
             If True, local matrices are transformed to the global frame.
             Default is True.
+        format : str, Optional
+            The format of the sparse result, one of 'coo', 'csr', 'csc', 'bsr',
+            'lil', 'dok' or 'dia'. Only if 'sparse' is True. Default is 'coo'.
+            See :func:`sigmaepsilon.fem.mesh.FemMesh.elastic_stiffness_matrix`
+            for the details.
 
         Returns
         -------
-        numpy.ndarray or scipy.sparse.coo_matrix
+        numpy.ndarray or scipy.sparse.spmatrix
+            A sparse matrix in the requested format if 'sparse' is True,
+            a dense array otherwise.
         """
         if penalize:
             assert transform, "Must transform to penalize."
             assert sparse, "Penalization is only available for sparse results."
         if sparse:
             assert transform, "Must transform for a sparse output."
-        params = dict(sparse=sparse, transform=transform)
+        params = dict(sparse=sparse, transform=transform, format=format)
         params.update(**kwargs)
-        M_sparse = self.mesh.elastic_stiffness_matrix(**params)
+        K = self.mesh.elastic_stiffness_matrix(**params)
         if penalize:
-            M_sparse += self.mesh.essential_penalty_matrix()
-        return M_sparse.tocoo()
+            K += self.mesh.essential_penalty_matrix()
+        return K.asformat(format) if sparse else K
 
     def essential_penalty_matrix(self, *args, **kwargs) -> coo_matrix:
         """
@@ -330,6 +339,45 @@ class Structure:
         """
         return self.mesh.internal_forces(*args, flatten=flatten, **kwargs)
 
+    def internal_forces_batched(
+        self,
+        blocks: Iterable[FemMesh] = None,
+        *,
+        points: Iterable = None,
+        target: Union[str, ReferenceFrame] = "local",
+        ctx: _PostprocessContext = None,
+    ) -> List[ndarray]:
+        """
+        Returns the internal forces of several blocks at the same points of
+        evaluation. The data of blocks with the same cell type is stacked and
+        the forces are calculated in one go for all of them.
+
+        Parameters
+        ----------
+        blocks: Iterable[FemMesh], Optional
+            The blocks to evaluate. If not provided, all the blocks of the mesh
+            are evaluated. Default is None.
+        points: Iterable, Optional
+            Points of evaluation in the master domain of the cells, for 1d cells
+            as well, that is in the range [-1, 1]. If not provided, results are
+            returned for the nodes of the cells. Default is None.
+        target: Union[str, ReferenceFrame], Optional
+            The target frame. Default is 'local'.
+        ctx: object, Optional
+            A context returned by :func:`FemMesh.postprocess_context`, to reuse
+            data between consecutive calls. Default is None.
+
+        Returns
+        -------
+        List[numpy.ndarray]
+            A list of arrays of shape (nE, nP, nSTRE, nRHS), one for every block.
+        """
+        if blocks is None:
+            blocks = self.mesh.cellblocks_inclusive
+        return self.mesh._internal_forces_by_type_(
+            blocks, points=points, rng=[-1, 1], target=target, ctx=ctx
+        )
+
     def external_forces(self, *args, flatten: bool = False, **kwargs) -> ndarray:
         """
         Returns the external forces for one or more elements.
@@ -347,6 +395,16 @@ class Structure:
         """
         Performs a linear elastostatic calculation with pre- and
         post-processing.
+
+        Parameters
+        ----------
+        solver: str, Optional
+            The solver to use. See :func:`StaticSolver.solve` for the details.
+        strain_loads: dict, Optional
+            Strain loads for some of the blocks, keyed by the ids of the blocks.
+            These are only used to build the load vector of the current
+            calculation and are not stored in the database of the cells.
+            Default is None.
         """
         self._preproc_linstat_(*args, **kwargs)
         self._proc_linstat_(*args, **kwargs)
@@ -424,7 +482,7 @@ class Structure:
         --------
         :func:`preprocess`
         """
-        blocks = self.mesh.cellblocks(inclusive=True)
+        blocks = self.mesh.cellblocks_inclusive
         for block in blocks:
             nE = len(block.celldata)
             # populate frames
@@ -433,7 +491,7 @@ class Structure:
                 block.celldata.frames = frames
         return self
 
-    def _assemble_linstat_(self, *_, **__):
+    def _assemble_linstat_(self, *_, strain_loads: dict = None, **__):
         mesh = self.mesh
         jagged = mesh.is_jagged()
 
@@ -445,19 +503,21 @@ class Structure:
         else:
             mesh.cell_load_vector(assemble=False, transform=False)
         mesh.elastic_stiffness_matrix(sparse=False, transform=False, _jagged=jagged)
-        # condensate
-        mesh.condensate_cell_fixity()
+        # condensate, the load vectors with strain loads are condensed along with
+        # the stiffness matrices, but they are not stored in the database
+        cell_loads = mesh._condensate_cell_fixity_(strain_loads=strain_loads)
+        params = dict(strain_loads=strain_loads, _cell_loads=cell_loads)
         # get condensated data
         f_nodal = mesh.nodal_load_vector()
         if jagged:
-            f_bulk = mesh.cell_load_vector(assemble=True, transform=True)
+            f_bulk = mesh.cell_load_vector(assemble=True, transform=True, **params)
             K_bulk = mesh.elastic_stiffness_matrix(
                 sparse=False,
                 transform=True,
                 _jagged=jagged,
             )
         else:
-            f_bulk = mesh.cell_load_vector(assemble=False, transform=False)
+            f_bulk = mesh.cell_load_vector(assemble=False, transform=False, **params)
             K_bulk = mesh.elastic_stiffness_matrix(
                 sparse=False, transform=False, _jagged=jagged
             )
@@ -534,8 +594,8 @@ class Structure:
         self._assemble_free_vib_(*args, **kwargs)
         return self
 
-    def _proc_linstat_(self, *args, **kwargs) -> "Structure":
-        self._static_solver_.solve(*args, **kwargs)
+    def _proc_linstat_(self, *_, solver: str = None, **__) -> "Structure":
+        self._static_solver_.solve(solver=solver)
         return self
 
     def _proc_free_vib_(self, *args, **kwargs) -> "Structure":
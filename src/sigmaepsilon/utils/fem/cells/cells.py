@@ -1,4 +1,4 @@
-from typing import Callable
+from typing import Callable, Tuple
 from numba import njit, prange
 import numpy as np
 from numpy import ndarray
@@ -17,6 +17,16 @@ def element_centers(ecoords: np.ndarray):
     return np.mean(ecoords, axis=1)
 
 
+@njit(nogil=True, inline="always", cache=__cache)
+def _inv2(J: ndarray) -> Tuple[float, float, float, float, float]:
+    """
+    Returns the entries of the inverse of a 2x2 matrix in row-major order,
+    followed by its determinant.
+    """
+    det = J[0, 0] * J[1, 1] - J[0, 1] * J[1, 0]
+    return J[1, 1] / det, -J[0, 1] / det, -J[1, 0] / det, J[0, 0] / det, det
+
+
 @njit(nogil=True, parallel=True, cache=__cache)
 def int_domain(
     points: np.ndarray,
@@ -1,6 +1,6 @@
 import numpy as np
 from numpy import ndarray
-from numba import njit, vectorize, prange
+from numba import njit, vectorize
 
 __cache = True
 
@@ -35,6 +35,28 @@ def HMH_S(strs: ndarray):
     )
 
 
+def HMH_S_bulk(strs: ndarray) -> ndarray:
+    """
+    Evaluates the Huber-Mises-Hencky formula for shells at several points
+    at once, using vectorized NumPy operations.
+
+    Parameters
+    ----------
+    strs : numpy.ndarray
+        An array of stresses, with the stresses s11, s22, s12, s13, s23
+        along the last axis.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array with the shape of the input without its last axis.
+    """
+    s11, s22, s12, s13, s23 = np.moveaxis(strs, -1, 0)
+    return np.sqrt(
+        s11**2 - s11 * s22 + s22**2 + 3 * (s12**2 + s13**2 + s23**2)
+    )
+
+
 @njit(nogil=True, cache=__cache)
 def HMH_3d(strs: ndarray):
     """
@@ -66,7 +88,7 @@ def HMH_3d_multi(strs: ndarray):
     """
     nP = strs.shape[0]
     res = np.zeros(nP, dtype=strs.dtype)
-    for i in prange(nP):
+    for i in range(nP):
         res[i] = HMH_3d(strs[i])
     return res
 
@@ -0,0 +1,340 @@
+import unittest
+import numpy as np
+from numpy import ndarray
+
+from neumann import repeat
+from polymesh.space import StandardFrame
+from polymesh.grid import gridH8
+from polymesh.utils import cell_centers_bulk
+from polymesh.utils.space import index_of_closest_point
+from sigmaepsilon import PointData, SolidMesh
+from sigmaepsilon.fem.cells import H8
+from sigmaepsilon.fem.homg import RepresentativeVolumeElement
+from sigmaepsilon.fem.homg.utils import (
+    _homogenize_block_3d_kernel,
+    _shape_function_data,
+    _strain_field_3d_bulk,
+    _tr_strains_to_local_frames,
+)
+
+
+def _postproc_3d_gauss_stresses(
+    cell_stresses: ndarray,  # cell stresses
+    cell_gauss_coords: ndarray,  # cell gauss coordinates
+    weights: ndarray,  # gauss weights
+    djac: ndarray,  # jacobian determinants
+    out: ndarray,  # ABD or ABDS matrix of shape (6, 6) or (8, 8)
+) -> ndarray:
+    nE, nP = cell_gauss_coords.shape[:2]
+    NSTRE = out.shape[0]
+    mindlin = NSTRE == 8
+    for iE in range(nE):
+        for iP in range(nP):
+            w = weights[iP]
+            z = cell_gauss_coords[iE, iP, 2]
+            dj = djac[iE, iP]
+            for j in range(NSTRE):
+                sxx, syy, _, syz, sxz, sxy = cell_stresses[iE, iP, :, j]
+                out[0, j] += sxx * w * dj
+                out[1, j] += syy * w * dj
+                out[2, j] += sxy * w * dj
+                out[3, j] += sxx * z * w * dj
+                out[4, j] += syy * z * w * dj
+                out[5, j] += sxy * z * w * dj
+                if mindlin:
+                    out[6, j] += sxz * w * dj
+                    out[7, j] += syz * w * dj
+    return out
+
+
+def _calc_avg_hooke_3d_to_shell(
+    hooke: ndarray,  # cell material stiffness matrices
+    cell_gauss_coords: ndarray,  # cell gauss coordinates
+    weights: ndarray,  # gauss weights
+    djac: ndarray,  # jacobian determinants
+    out: ndarray,  # ABD or ABDS matrix of shape (6, 6) or (8, 8)
+) -> ndarray:
+    C_126 = np.zeros((3, 3), dtype=hooke.dtype)
+    C_45 = np.zeros((2, 2), dtype=hooke.dtype)
+    nE, nP = cell_gauss_coords.shape[:2]
+    NSTRE = out.shape[0]
+    mindlin = NSTRE == 8
+    for iE in range(nE):
+        C11 = hooke[iE, 0, 0]
+        C12 = hooke[iE, 0, 1]
+        C22 = hooke[iE, 1, 1]
+        C66 = hooke[iE, 5, 5]
+        C55 = hooke[iE, 4, 4]
+        C44 = hooke[iE, 3, 3]
+        C_126[0, 0] = C11
+        C_126[0, 1] = C12
+        C_126[1, 0] = C12
+        C_126[1, 1] = C22
+        C_126[2, 2] = C66
+        if mindlin:
+            C_45[0, 0] = C55
+            C_45[1, 1] = C44
+        for iP in range(nP):
+            w = weights[iP]
+            z = cell_gauss_coords[iE, iP, 2]
+            dj = djac[iE, iP]
+            out[:3, :3] += C_126 * w * dj
+            out[:3, 3:6] += C_126 * z * w * dj
+            out[3:6, :3] += C_126 * z * w * dj
+            out[3:6, 3:6] += C_126 * z**2 * w * dj
+            if mindlin:
+                out[6:, 6:] += C_45 * w * dj
+    return out
+
+
+def _hooke_3d(E: float, nu: float) -> ndarray:
+    lam = E * nu / ((1 + nu) * (1 - 2 * nu))
+    mu = E / (2 * (1 + nu))
+    hooke = np.zeros((6, 6))
+    hooke[:3, :3] = lam
+    hooke[:3, :3] += 2 * mu * np.eye(3)
+    hooke[3:, 3:] = mu * np.eye(3)
+    return hooke
+
+
+def _rotation_z(angle: float) -> ndarray:
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, s, 0.0], [-s, c, 0.0], [0.0, 0.0, 1.0]])
+
+
+def _homogenize_baseline(rve: RepresentativeVolumeElement, target: str) -> ndarray:
+    """
+    The original implementation of the homogenization, that stores the strain
+    loads in the database of the cells and postprocesses the blocks one by one.
+    """
+    mesh = rve.mesh
+    NDOFN = mesh.NDOFN
+    NSTRE = 8 if target.lower() == "mr" else 6
+
+    points = mesh.points()
+    [(xmin, xmax), (ymin, ymax), (_, zmax)] = points.bounds()
+    area = (xmax - xmin) * (ymax - ymin)
+
+    mesh.pd.loads = np.zeros((len(points), NDOFN, NSTRE), dtype=float)
+
+    nodal_fixity = np.zeros((len(points), NDOFN), dtype=bool)
+    corners = np.array(
+        [
+            [xmin, ymax, zmax],
+            [xmax, ymax, zmax],
+            [xmin, ymin, zmax],
+            [xmax, ymin, zmax],
+        ]
+    )
+    i = index_of_closest_point(points.show(), corners)
+    nodal_fixity[i[0], :3] = True
+    nodal_fixity[i[1], 2] = True
+    nodal_fixity[i[2], 2] = True
+    nodal_fixity[i[3], 1] = True
+    mesh.pd.fixity = nodal_fixity
+
+    periodicity_constraints = rve._periodic_essential_ebc(axis=[0, 1])
+
+    blocks = list(mesh.cellblocks(inclusive=True))
+    for block in blocks:
+        centers = block.cd.centers()
+        strain_loads = np.zeros((centers.shape[0], NSTRE, 6))
+        _strain_field_3d_bulk(centers, out=strain_loads, NSTRE=NSTRE)
+        strain_loads[...] = _tr_strains_to_local_frames(
+            strain_loads, mesh.frame, block.cd.frames
+        )
+        block.cd.strain_loads = np.moveaxis(strain_loads, -1, -2)
+
+    rve.constraints.append(periodicity_constraints)
+    rve.linear_static_analysis()
+
+    hooke = np.zeros((NSTRE, NSTRE), dtype=float)
+    hooke_avg = np.zeros_like(hooke)
+    for block in blocks:
+        block.cd.strain_loads = None
+        hooke_block = block.cd.elastic_material_stiffness_matrix(target="global")
+        gp, gw = block.cd.quadrature["full"]
+        cell_forces = block.cd.internal_forces(
+            points=gp, flatten=False, target="global"
+        )
+        ec = block.cd.coords()
+        dshp = block.cd.shape_function_derivatives(gp)
+        jac = block.cd.jacobian_matrix(dshp=dshp, ecoords=ec)
+        djac = block.cd.jacobian(jac=jac)
+        ec = block.cd.coords(points=gp)
+        _postproc_3d_gauss_stresses(cell_forces, ec, gw, djac, hooke)
+        _calc_avg_hooke_3d_to_shell(hooke_block, ec, gw, djac, hooke_avg)
+
+    rve.constraints.pop(-1)
+
+    hooke /= area
+    hooke_avg /= area
+    result = hooke_avg - hooke
+    if NSTRE == 8:
+        result[6:8, 6:8] = hooke[6:8, 6:8] * 5 / 6
+    result = (result + result.T) / 2
+    return result
+
+
+class TestHomogenizationKernels(unittest.TestCase):
+    def _random_block(self, nE: int, NSTRE: int):
+        """
+        Returns a column of distorted hexahedra stacked along the z axis,
+        with random stresses and material stiffness matrices.
+        """
+        rng = np.random.default_rng(0)
+        gp, gw = H8.quadrature["full"]
+        shp, dshp = _shape_function_data(H8, gp)
+        nP = len(gw)
+        cube = np.array(
+            [
+                [-0.5, -0.5, 0.0],
+                [0.5, -0.5, 0.0],
+                [0.5, 0.5, 0.0],
+                [-0.5, 0.5, 0.0],
+                [-0.5, -0.5, 1.0],
+                [0.5, -0.5, 1.0],
+                [0.5, 0.5, 1.0],
+                [-0.5, 0.5, 1.0],
+            ]
+        )
+        ec = np.stack([cube + [0.0, 0.0, iE - nE / 2] for iE in range(nE)])
+        ec += 0.05 * rng.random(ec.shape)
+        stresses = rng.random((nE, nP, 6, NSTRE))
+        hooke = rng.random((nE, 6, 6))
+        hooke = hooke + np.transpose(hooke, (0, 2, 1))
+        return ec, shp, dshp, np.array(gw), stresses, hooke
+
+    def _reference(self, ec, shp, dshp, gw, stresses, hooke, NSTRE):
+        gauss_coords = np.einsum("pk,ekd->epd", shp, ec)
+        jac = np.einsum("ekd,pkj->epdj", ec, dshp)
+        djac = np.linalg.det(jac)
+        out = np.zeros((NSTRE, NSTRE))
+        out_avg = np.zeros((NSTRE, NSTRE))
+        _postproc_3d_gauss_stresses(stresses, gauss_coords, gw, djac, out)
+        _calc_avg_hooke_3d_to_shell(hooke, gauss_coords, gw, djac, out_avg)
+        return out, out_avg
+
+    def test_homogenize_block_3d_kernel(self):
+        for NSTRE in (6, 8):
+            for nE in (1, 5):
+                data = self._random_block(nE, NSTRE)
+                out_ref, out_avg_ref = self._reference(*data, NSTRE)
+                for nchunks in (1, 3, 8):
+                    out = np.zeros((NSTRE, NSTRE))
+                    out_avg = np.zeros((NSTRE, NSTRE))
+                    _homogenize_block_3d_kernel(*data, out, out_avg, NSTRE, nchunks)
+                    self.assertTrue(np.allclose(out, out_ref))
+                    self.assertTrue(np.allclose(out_avg, out_avg_ref))
+
+    def test_homogenize_block_3d_kernel_single_precision(self):
+        NSTRE = 8
+        data = self._random_block(4, NSTRE)
+        out_ref, out_avg_ref = self._reference(*data, NSTRE)
+        out = np.zeros((NSTRE, NSTRE))
+        out_avg = np.zeros((NSTRE, NSTRE))
+        data = [x.astype(np.float32) for x in data]
+        _homogenize_block_3d_kernel(*data, out, out_avg, NSTRE, 2)
+        self.assertTrue(np.allclose(out, out_ref, rtol=1e-4))
+        self.assertTrue(np.allclose(out_avg, out_avg_ref, rtol=1e-4))
+
+
+class TestRepresentativeVolumeElement(unittest.TestCase):
+    """
+    A plate of two layers, with an orthotropic top layer in rotated frames.
+    The results are compared against the original implementation.
+    """
+
+    Lx, Ly, t = 1.0, 1.0, 0.4
+
+    def _block(self, topo: ndarray, hooke: ndarray, angle: float) -> SolidMesh:
+        nE = topo.shape[0]
+        cd = H8(
+            topo=topo,
+            frames=repeat(_rotation_z(angle), nE),
+            material=repeat(hooke, nE),
+            density=np.ones(nE),
+        )
+        return SolidMesh(cd)
+
+    def _top_hooke(self, E: float) -> ndarray:
+        hooke = _hooke_3d(E, 0.3)
+        hooke[0, 0] *= 2
+        return hooke
+
+    def _layers(self, t: float):
+        size = self.Lx, self.Ly, t
+        coords, topo = gridH8(size=size, shape=(3, 3, 4), start=0)
+        coords[:, 2] -= (coords[:, 2].min() + coords[:, 2].max()) / 2
+        centers = cell_centers_bulk(coords, topo)
+        cond = centers[:, 2] < 0
+        return coords, topo[cond], topo[~cond]
+
+    def _rve(
+        self, E_top: float = 2000.0, angle: float = np.pi / 6, t: float = None
+    ) -> RepresentativeVolumeElement:
+        coords, topo_bottom, topo_top = self._layers(self.t if t is None else t)
+        frame = StandardFrame(dim=3)
+        pd = PointData(coords=coords, frame=frame)
+        mesh = SolidMesh(pd, frame=frame)
+        mesh["bottom"] = self._block(topo_bottom, _hooke_3d(1000.0, 0.2), 0.0)
+        mesh["top"] = self._block(topo_top, self._top_hooke(E_top), angle)
+        return RepresentativeVolumeElement(mesh=mesh, symmetric=True)
+
+    def test_homogenize(self):
+        for target, NSTRE in (("MR", 8), ("KL", 6)):
+            result_ref = _homogenize_baseline(self._rve(), target)
+            rve = self._rve()
+            result = rve.homogenize(target)
+            self.assertEqual(result.shape, (NSTRE, NSTRE))
+            self.assertTrue(np.allclose(result, result.T))
+            self.assertTrue(np.all(np.diag(result) > 0))
+            self.assertTrue(np.allclose(result, result_ref))
+            for block in rve.mesh.cellblocks_inclusive:
+                self.assertFalse(block.cd.has_strain_loads)
+        self.assertTrue(np.allclose(self._rve().ABDS(), self._rve().homogenize("MR")))
+        self.assertTrue(np.allclose(self._rve().ABD(), self._rve().homogenize("KL")))
+
+    def test_homogenize_single_precision(self):
+        result_ref = _homogenize_baseline(self._rve(), "MR")
+        result = self._rve().homogenize("MR", dtype=np.float32)
+        scale = np.abs(result_ref).max()
+        self.assertTrue(np.allclose(result, result_ref, atol=1e-4 * scale))
+
+    def test_repeated_homogenization(self):
+        rve = self._rve()
+        ABDS = rve.ABDS()
+        buffers = dict(rve._buf_cache)
+        self.assertEqual(len(rve._periodicity_cache), 1)
+        self.assertEqual(len(rve._frame_cache), 2)
+        self.assertTrue(np.allclose(rve.ABDS(), ABDS))
+        for key, buffer in buffers.items():
+            self.assertIs(rve._buf_cache[key], buffer)
+        self.assertTrue(np.allclose(rve.ABD(), _homogenize_baseline(self._rve(), "KL")))
+        self.assertTrue(np.allclose(rve.ABDS(), ABDS))
+
+    def test_invalidate_geometry_cache(self):
+        rve = self._rve()
+        rve.ABDS()
+        # replace the top layer with one of a different material and orientation
+        E_top, angle = 5000.0, np.pi / 3
+        _, _, topo = self._layers(self.t)
+        del rve.mesh["top"]
+        rve.mesh["top"] = self._block(topo, self._top_hooke(E_top), angle)
+        rve.invalidate_geometry_cache()
+        self.assertEqual(len(rve._buf_cache), 0)
+        self.assertEqual(len(rve._periodicity_cache), 0)
+        self.assertEqual(len(rve._frame_cache), 0)
+        result_ref = _homogenize_baseline(self._rve(E_top, angle), "MR")
+        self.assertTrue(np.allclose(rve.ABDS(), result_ref))
+        # a new mesh with a different thickness
+        rve.mesh = self._rve(t=2 * self.t).mesh
+        self.assertEqual(len(rve._buf_cache), 0)
+        self.assertEqual(len(rve._periodicity_cache), 0)
+        self.assertEqual(len(rve._frame_cache), 0)
+        result_ref = _homogenize_baseline(self._rve(t=2 * self.t), "MR")
+        self.assertTrue(np.allclose(rve.ABDS(), result_ref))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,294 @@
+import unittest
+import numpy as np
+
+from neumann import repeat
+from neumann.linalg import linspace
+from polymesh.space import StandardFrame
+from polymesh.grid import gridH8
+from polymesh.utils import cell_centers_bulk
+from sigmaepsilon import Structure, PointData, SolidMesh, LineMesh
+from sigmaepsilon.fem.cells import H8, B2
+
+
+def _hooke_3d(E: float = 1000.0, nu: float = 0.2) -> np.ndarray:
+    return np.array(
+        [
+            [1, nu, nu, 0, 0, 0],
+            [nu, 1, nu, 0, 0, 0],
+            [nu, nu, 1, 0, 0, 0],
+            [0.0, 0, 0, (1 - nu) / 2, 0, 0],
+            [0.0, 0, 0, 0, (1 - nu) / 2, 0],
+            [0.0, 0, 0, 0, 0, (1 - nu) / 2],
+        ]
+    ) * (E / (1 - nu**2))
+
+
+class TestSolidMeshBlocks(unittest.TestCase):
+    """
+    A console of hexahedral cells, split into two blocks of the same cell type.
+    """
+
+    Lx, Ly, Lz = 10.0, 2.0, 2.0
+
+    def setUp(self):
+        self.frame = StandardFrame(dim=3)
+        size = self.Lx, self.Ly, self.Lz
+        coords, topo = gridH8(size=size, shape=(6, 2, 2), origo=(0, 0, 0), start=0)
+        fixity = np.zeros((coords.shape[0], 3), dtype=bool)
+        fixity[coords[:, 0] <= 0.001, :] = True
+        loads = np.zeros((coords.shape[0], 3))
+        loads[coords[:, 0] >= self.Lx - 0.001, 2] = -1.0
+        pd = PointData(coords=coords, frame=self.frame, loads=loads, fixity=fixity)
+        centers = cell_centers_bulk(coords, topo)
+        cond = centers[:, 0] < self.Lx / 2
+        self.topo = {"A": topo[cond], "B": topo[~cond]}
+        self.mesh = SolidMesh(pd, frame=self.frame)
+        for key, topo_block in self.topo.items():
+            self.mesh[key] = self._block(topo_block)
+
+    def _block(self, topo: np.ndarray) -> SolidMesh:
+        nE = topo.shape[0]
+        cd = H8(
+            topo=topo,
+            frames=repeat(self.frame.show(), nE),
+            material=repeat(_hooke_3d(), nE),
+            density=np.ones(nE),
+        )
+        return SolidMesh(cd)
+
+    def _solve(self) -> Structure:
+        structure = Structure(mesh=self.mesh)
+        structure.linear_static_analysis()
+        structure.nodal_dof_solution(store="dofsol")
+        return structure
+
+    def _block_matrix(self, block: SolidMesh, method: str) -> np.ndarray:
+        return getattr(block.cd, method)(sparse=True, transform=True).toarray()
+
+    def test_cellblocks_cache(self):
+        mesh = self.mesh
+        self.assertEqual(len(mesh.cellblocks_inclusive), 2)
+        version = mesh._topology_version
+        del mesh["B"]
+        self.assertEqual(len(mesh.cellblocks_inclusive), 1)
+        self.assertGreater(mesh._topology_version, version)
+        version = mesh._topology_version
+        mesh["A"].invalidate_cellblocks_cache()
+        self.assertGreater(mesh._topology_version, version)
+        mesh["B"] = self._block(self.topo["B"])
+        self.assertEqual(len(mesh.cellblocks_inclusive), 2)
+
+    def test_assembly_pattern(self):
+        mesh = self.mesh
+        K = mesh.elastic_stiffness_matrix(sparse=True).toarray()
+        M = mesh.consistent_mass_matrix(sparse=True).toarray()
+        # the patterns of the stiffness and the mass matrices are cached separately
+        K_ref = sum(
+            self._block_matrix(b, "elastic_stiffness_matrix")
+            for b in mesh.cellblocks_inclusive
+        )
+        M_ref = sum(
+            self._block_matrix(b, "consistent_mass_matrix")
+            for b in mesh.cellblocks_inclusive
+        )
+        self.assertTrue(np.allclose(K, K_ref))
+        self.assertTrue(np.allclose(M, M_ref))
+        self.assertTrue(
+            np.allclose(mesh.elastic_stiffness_matrix(sparse=True).toarray(), K_ref)
+        )
+        self.assertTrue(
+            np.allclose(mesh.consistent_mass_matrix(sparse=True).toarray(), M_ref)
+        )
+        # the cached patterns must be invalidated if a block is removed
+        del mesh["B"]
+        K = mesh.elastic_stiffness_matrix(sparse=True).toarray()
+        K_A = self._block_matrix(mesh["A"], "elastic_stiffness_matrix")
+        self.assertTrue(np.allclose(K, K_A))
+        # and if a block is added
+        mesh["B"] = self._block(self.topo["B"])
+        K = mesh.elastic_stiffness_matrix(sparse=True).toarray()
+        self.assertTrue(np.allclose(K, K_ref))
+        K = mesh.elastic_stiffness_matrix(sparse=True, format="csr")
+        self.assertEqual(K.format, "csr")
+        self.assertTrue(np.allclose(K.toarray(), K_ref))
+        with self.assertRaises(ValueError):
+            mesh.elastic_stiffness_matrix(sparse=True, format="xyz")
+
+    def test_structure_stiffness_matrix(self):
+        structure = Structure(mesh=self.mesh)
+        K_ref = self.mesh.elastic_stiffness_matrix(sparse=True).toarray()
+        params = dict(sparse=True, transform=True)
+        for format in ("coo", "csr", "csc"):
+            K = structure.elastic_stiffness_matrix(format=format, **params)
+            self.assertEqual(K.format, format)
+            self.assertTrue(np.allclose(K.toarray(), K_ref))
+        K = structure.elastic_stiffness_matrix(penalize=True, format="csr", **params)
+        self.assertEqual(K.format, "csr")
+
+    def test_strains(self):
+        self._solve()
+        mesh = self.mesh
+        strains = mesh.strains()
+        strains_ref = np.vstack([b.cd.strains() for b in mesh.cellblocks_inclusive])
+        self.assertTrue(np.allclose(strains, strains_ref))
+        gp, _ = H8.quadrature["full"]
+        strains = mesh.strains(points=gp)
+        strains_ref = np.vstack(
+            [b.cd.strains(points=gp) for b in mesh.cellblocks_inclusive]
+        )
+        self.assertTrue(np.allclose(strains, strains_ref))
+        # unknown arguments are ignored, like by the cells
+        self.assertTrue(np.allclose(mesh.strains(points=gp, foo=1), strains_ref))
+
+    def test_internal_forces(self):
+        structure = self._solve()
+        mesh = self.mesh
+        blocks = mesh.cellblocks_inclusive
+        gp, _ = H8.quadrature["full"]
+        for points in (None, gp):
+            for target in ("local", "global"):
+                params = dict(points=points, target=target)
+                forces = structure.internal_forces_batched(**params)
+                for f, b in zip(forces, blocks):
+                    f_ref = b.cd.internal_forces(flatten=False, **params)
+                    self.assertTrue(np.allclose(f, f_ref))
+                forces = mesh.internal_forces(flatten=True, **params)
+                forces_ref = np.vstack(
+                    [b.cd.internal_forces(flatten=True, **params) for b in blocks]
+                )
+                self.assertTrue(np.allclose(forces, forces_ref))
+        # unknown arguments are ignored, like by the cells
+        forces = mesh.internal_forces(flatten=False)
+        self.assertTrue(np.allclose(mesh.internal_forces(flatten=False, foo=1), forces))
+
+    def test_postprocess_context(self):
+        structure = self._solve()
+        mesh = self.mesh
+        strains = mesh.strains()
+        forces = mesh.internal_forces(flatten=False)
+        forces_batched = structure.internal_forces_batched()
+        with mesh.postprocess_context() as ctx:
+            for _ in range(2):
+                self.assertTrue(np.allclose(mesh.strains(ctx=ctx), strains))
+                self.assertTrue(
+                    np.allclose(mesh.internal_forces(flatten=False, ctx=ctx), forces)
+                )
+                for f, f_ref in zip(
+                    structure.internal_forces_batched(ctx=ctx), forces_batched
+                ):
+                    self.assertTrue(np.allclose(f, f_ref))
+            self.assertTrue(len(ctx._cache) > 0)
+            # the cached data is dropped if the solution is replaced
+            mesh.pd.dofsol = 2 * mesh.pd.dofsol
+            self.assertTrue(np.allclose(mesh.strains(ctx=ctx), 2 * strains))
+            self.assertTrue(
+                np.allclose(mesh.internal_forces(flatten=False, ctx=ctx), 2 * forces)
+            )
+        self.assertEqual(len(ctx._cache), 0)
+
+
+class TestLineMeshBatched(unittest.TestCase):
+    def test_internal_forces_batched_1d(self):
+        """
+        The batched internal forces of 1d cells are evaluated at points
+        understood in the master domain [-1, 1].
+        """
+        L, n = 100.0, 4
+        Ex, nu = 210000.0, 0.25
+        w, h = 5.0, 10.0
+        A, Iy, Iz = w * h, w * h**3 / 12, h * w**3 / 12
+        G = Ex / (2 * (1 + nu))
+        Hooke = np.diag([Ex * A, G * (Iy + Iz), Ex * Iy, Ex * Iz])
+        frame = StandardFrame(dim=3)
+        coords = linspace(np.zeros(3), np.array([L, 0.0, 0.0]), n + 1)
+        topo = np.stack([np.arange(n), np.arange(n) + 1], axis=1)
+        fixity = np.zeros((coords.shape[0], 6))
+        fixity[0, :] = 1e20
+        loads = np.zeros((coords.shape[0], 6))
+        loads[-1, 2] = 1.0
+        pd = PointData(coords=coords, frame=frame, loads=loads, fixity=fixity)
+        cd = B2(topo=topo, material=Hooke, frames=repeat(frame.show(), n))
+        mesh = LineMesh(pd, cd, frame=frame)
+        structure = Structure(mesh=mesh)
+        structure.linear_static_analysis()
+        structure.nodal_dof_solution(store="dofsol")
+        (forces,) = structure.internal_forces_batched(points=[-1.0, 0.0, 1.0])
+        (block,) = mesh.cellblocks_inclusive
+        forces_ref = block.cd.internal_forces(points=[0.0, 0.5, 1.0], flatten=False)
+        self.assertTrue(np.allclose(forces, forces_ref))
+        # the range of the points is forwarded to the cells
+        params = dict(points=[-1.0, 0.0, 1.0], rng=[-1, 1])
+        strains = mesh.strains(**params)
+        self.assertTrue(np.allclose(strains, block.cd.strains(**params)))
+
+
+class TestStrainLoads(unittest.TestCase):
+    """
+    A beam clamped at both ends with a hinge at midspan, subjected to
+    thermal curvatures. The hinge is modelled with cell fixity, hence the
+    cells of the first block are condensed.
+    """
+
+    L, n = 100.0, 4
+
+    def _structure(self, stored: bool = False) -> Structure:
+        Ex, nu = 210000.0, 0.25
+        w, h = 5.0, 10.0
+        A, Iy, Iz = w * h, w * h**3 / 12, h * w**3 / 12
+        G = Ex / (2 * (1 + nu))
+        Hooke = np.diag([Ex * A, G * (Iy + Iz), Ex * Iy, Ex * Iz])
+        frame = StandardFrame(dim=3)
+        n = self.n
+        coords = linspace(np.zeros(3), np.array([self.L, 0.0, 0.0]), n + 1)
+        topo = np.stack([np.arange(n), np.arange(n) + 1], axis=1)
+        fixity = np.zeros((coords.shape[0], 6), dtype=bool)
+        fixity[[0, -1], :] = True
+        loads = np.zeros((coords.shape[0], 6))
+        pd = PointData(coords=coords, frame=frame, loads=loads, fixity=fixity)
+        mesh = LineMesh(pd, frame=frame)
+        m = n // 2
+        cell_fixity = np.ones((m, 2, 6), dtype=bool)
+        cell_fixity[-1, -1, 4] = False  # release the rotation at midspan
+        blocks = {"A": (topo[:m], cell_fixity), "B": (topo[m:], None)}
+        for key, (topo_block, cell_fixity) in blocks.items():
+            nE = topo_block.shape[0]
+            cd = B2(
+                topo=topo_block,
+                material=Hooke,
+                frames=repeat(frame.show(), nE),
+                fixity=cell_fixity,
+                strain_loads=self._strain_loads(nE) if stored else None,
+            )
+            mesh[key] = LineMesh(cd)
+        return Structure(mesh=mesh)
+
+    def _strain_loads(self, nE: int) -> np.ndarray:
+        strain_loads = np.zeros((nE, 4, 1))
+        strain_loads[:, 0, 0] = 1e-4
+        strain_loads[:, 2, 0] = 1e-5
+        return strain_loads
+
+    def test_linear_static_analysis(self):
+        structure = self._structure(stored=True)
+        structure.linear_static_analysis()
+        dofsol_ref = structure.mesh.nodal_dof_solution()
+        self.assertTrue(np.abs(dofsol_ref).max() > 0)
+
+        structure = self._structure()
+        blocks = list(structure.mesh.cellblocks_inclusive)
+        strain_loads = {id(b): self._strain_loads(len(b.cd)) for b in blocks}
+        structure.linear_static_analysis(strain_loads=strain_loads)
+        dofsol = structure.mesh.nodal_dof_solution()
+        self.assertTrue(np.allclose(dofsol, dofsol_ref))
+
+        # the strain loads must not be left behind in the database
+        for block in blocks:
+            cd = block.cd
+            self.assertFalse(cd.has_strain_loads)
+            f = cd.db[cd._dbkey_nodal_load_vector_].to_numpy()
+            self.assertTrue(np.allclose(f, 0.0))
+        self.assertTrue(blocks[0].cd.has_fixity)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+
+from sigmaepsilon.fem.material.mindlinshell import (
+    strain_displacement_matrix,
+    elastic_stiffness_matrix,
+)
+from sigmaepsilon.utils.fem.cells.cells import (
+    strain_displacement_matrix_bulk2,
+    stiffness_matrix_bulk2,
+)
+
+
+class TestMindlinShellStiffness(unittest.TestCase):
+    """
+    The fused stiffness kernel of Mindlin shells is compared against the
+    evaluation of the strain-displacement matrices at the Gauss points,
+    followed by the generic integration routines.
+    """
+
+    def _random_data(self, nN: int, nE: int = 4, nP: int = 4):
+        rng = np.random.default_rng(nN)
+        shp = rng.random((nP, nN))
+        dshp = rng.random((nP, nN, 2)) - 0.5
+        jac = 0.2 * rng.random((nE, nP, 2, 2)) + 2 * np.eye(2)
+        weights = rng.random(nP)
+        D = rng.random((nE, 8, 8))
+        D = D + np.transpose(D, (0, 2, 1))
+        return shp, dshp, jac, weights, D
+
+    def _reference(self, shp, dshp, jac, weights, D, mask):
+        nN = dshp.shape[1]
+        B = strain_displacement_matrix(shp, dshp, jac, nN)
+        B = B * mask[None, None, :, None]
+        djac = np.linalg.det(jac)
+        K = stiffness_matrix_bulk2(D, B, djac, weights)
+        B = strain_displacement_matrix_bulk2(B, djac, weights)
+        return K, B
+
+    def test_elastic_stiffness_matrix(self):
+        masks = [
+            np.ones(8),
+            np.array([1.0, 1, 0, 1, 1, 1, 0, 0]),
+            np.array([0.0, 0, 1, 0, 0, 0, 1, 1]),
+        ]
+        for nN in (3, 4, 6, 8, 9):
+            shp, dshp, jac, weights, D = self._random_data(nN)
+            for mask in masks:
+                K_ref, B_ref = self._reference(shp, dshp, jac, weights, D, mask)
+                K, B = elastic_stiffness_matrix(shp, dshp, jac, weights, D, mask, nN)
+                self.assertEqual(K.shape, (4, nN * 6, nN * 6))
+                self.assertTrue(np.allclose(K, K_ref))
+                self.assertTrue(np.allclose(B, B_ref))
+
+    def test_elastic_stiffness_matrix_single_precision(self):
+        mask = np.ones(8)
+        for nN in (3, 4, 6, 8, 9):
+            data = self._random_data(nN)
+            K_ref, B_ref = self._reference(*data, mask)
+            data = [x.astype(np.float32) for x in data]
+            K, B = elastic_stiffness_matrix(*data, mask.astype(np.float32), nN)
+            self.assertEqual(K.dtype, np.float32)
+            scale = np.abs(K_ref).max()
+            self.assertTrue(np.allclose(K, K_ref, rtol=1e-4, atol=1e-5 * scale))
+            scale = np.abs(B_ref).max()
+            self.assertTrue(np.allclose(B, B_ref, rtol=1e-4, atol=1e-5 * scale))
+
+
+if __name__ == "__main__":
+    unittest.main()